@@ -0,0 +1,82 @@
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Tuple
+
+from .config import settings
+from . import metrics
+
+PRIORITIES = ("low", "high")
+
+
+class AdaptiveRouter:
+    """Routes interactive predictions away from the transformer under pressure.
+
+    Two signals are tracked for requests that take the model path: how many
+    are waiting or running (queue depth), and their latencies over the last
+    `window_s` seconds. A request is sent to the lexicon scorer instead when
+    the queue is full (any priority, "overflow"), or when the window's p95
+    exceeds the SLO (low priority only, "latency"). Nothing is remembered
+    beyond the window, so once degraded traffic has let the model catch up,
+    its samples age out and requests go back to the model by themselves.
+    """
+
+    def __init__(self, slo_ms: float, max_queue: int, window_s: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.slo = slo_ms / 1000.0
+        self.max_queue = max(1, max_queue)
+        self.window = window_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=512)
+        self.depth = 0
+
+    def _p95(self, now: float) -> float | None:
+        # caller holds _lock
+        while self._samples and self._samples[0][0] < now - self.window:
+            self._samples.popleft()
+        if not self._samples:
+            return None
+        ordered = sorted(s for _, s in self._samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def route(self, priority: str = "low") -> str | None:
+        """None to use the model, or the reason ("overflow" / "latency") to degrade."""
+        with self._lock:
+            if self.depth >= self.max_queue:
+                return "overflow"
+            p95 = self._p95(self._clock())
+        if priority == "low" and p95 is not None and p95 > self.slo:
+            return "latency"
+        return None
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Count a model-path request in the queue and record its latency."""
+        with self._lock:
+            self.depth += 1
+            metrics.QUEUE_DEPTH.set(self.depth)
+        t0 = self._clock()
+        try:
+            yield
+        finally:
+            now = self._clock()
+            with self._lock:
+                self.depth -= 1
+                metrics.QUEUE_DEPTH.set(self.depth)
+                self._samples.append((now, now - t0))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            p95 = self._p95(self._clock())
+            return {
+                "queue_depth": self.depth,
+                "max_queue": self.max_queue,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "slo_ms": round(self.slo * 1000, 1),
+            }
+
+
+router = AdaptiveRouter(settings.ADAPTIVE_SLO_MS, settings.ADAPTIVE_MAX_QUEUE, settings.ADAPTIVE_WINDOW_S)
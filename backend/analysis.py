@@ -0,0 +1,114 @@
+from __future__ import annotations
+import hashlib
+from typing import Any, Callable, Dict, List, Tuple
+
+from .metrics import timed
+from .sentiment_hf import predict as hf_predict
+
+
+def review_key(r: Dict[str, Any]) -> str:
+    """Stable id of a review, derived from its content and provenance."""
+    raw = "\x1f".join(str(r.get(k) or "") for k in ("text", "source", "timestamp"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def make_row(review: Dict[str, Any], pred: Dict[str, Any], review_id: str | None = None) -> Dict[str, Any]:
+    return {
+        "review_id": review_id or review_key(review),
+        "text": review.get("text", ""),
+        "source": review.get("source"),
+        "timestamp": review.get("timestamp"),
+        "label": pred["label"],
+        "score": float(pred["score"]),
+    }
+
+
+def plan_reviews(
+    reviews: List[Dict[str, Any]],
+    previous: List[Dict[str, Any]] | None = None,
+) -> Tuple[List[str], List[Dict[str, Any] | None], List[int]]:
+    """Match reviews against a previous analysis.
+
+    Returns (review keys, rows with reused entries filled in, indexes of the
+    reviews that still need a prediction).
+    """
+    scored: Dict[str, List[Dict[str, Any]]] = {}
+    for row in previous or []:
+        rid = row.get("review_id") or review_key(row)
+        scored.setdefault(rid, []).append(row)
+
+    keys = [review_key(r) for r in reviews]
+    rows: List[Dict[str, Any] | None] = []
+    todo: List[int] = []
+    for i, rid in enumerate(keys):
+        prior = scored.get(rid)
+        if prior:
+            rows.append(dict(prior.pop(0), review_id=rid))
+        else:
+            rows.append(None)
+            todo.append(i)
+    return keys, rows, todo
+
+
+@timed("analyze_reviews")
+def analyze_reviews(
+    reviews: List[Dict[str, Any]],
+    previous: List[Dict[str, Any]] | None = None,
+    chunk_size: int | None = None,
+    on_chunk: Callable[[List[Dict[str, Any]], int, int], None] | None = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Score reviews, reusing rows from a previous analysis where possible.
+
+    Rows are matched on review_key, so only new or edited reviews reach the
+    model. Reviews that no longer exist drop out of the result, and the output
+    always follows the order of `reviews`.
+
+    With `chunk_size`, the reviews to score go to the model that many at a
+    time and `on_chunk(new_rows, scored, to_score)` is called after each one.
+    """
+    keys, rows, todo = plan_reviews(reviews, previous)
+    step = chunk_size or len(todo) or 1
+    for start in range(0, len(todo), step):
+        part = todo[start:start + step]
+        preds = hf_predict([reviews[i].get("text", "") for i in part])
+        for i, p in zip(part, preds):
+            rows[i] = make_row(reviews[i], p, keys[i])
+        if on_chunk:
+            on_chunk([rows[i] for i in part], start + len(part), len(todo))
+
+    return rows, {"scored": len(todo), "reused": len(reviews) - len(todo)}
+
+
+@timed("analyze_many")
+def analyze_many(
+    movies: Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]] | None]],
+) -> Dict[str, Tuple[List[Dict[str, Any]], Dict[str, int]]]:
+    """analyze_reviews for several movies with a single model call.
+
+    `movies` maps an id to (reviews, previous). The unscored reviews of all
+    movies are pooled, so predict() forms full length-bucketed batches across
+    movies instead of a small batch per movie.
+    """
+    plans = {mid: (reviews, *plan_reviews(reviews, previous)) for mid, (reviews, previous) in movies.items()}
+    texts = [reviews[i].get("text", "") for reviews, _, _, todo in plans.values() for i in todo]
+    preds = iter(hf_predict(texts) if texts else [])
+    out = {}
+    for mid, (reviews, keys, rows, todo) in plans.items():
+        for i in todo:
+            rows[i] = make_row(reviews[i], next(preds), keys[i])
+        out[mid] = (rows, {"scored": len(todo), "reused": len(reviews) - len(todo)})
+    return out
+
+
+def appended_rows(previous: List[Dict[str, Any]] | None, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]] | None:
+    """Rows added after an unchanged `previous` prefix, or None if it was edited.
+
+    Lets callers append to the stored analysis (and its summary) instead of
+    rewriting it when reviews were only added.
+    """
+    if not previous or len(rows) < len(previous):
+        return None
+    for old, new in zip(previous, rows):
+        if old.get("review_id") is None or old.get("review_id") != new["review_id"]:
+            return None
+    return rows[len(previous):]
@@ -1,22 +1,50 @@
 from __future__ import annotations
-from fastapi import FastAPI, UploadFile, File, HTTPException, Response
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Response, Request
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Any
-import csv, io, os, json, datetime
+import csv, os, json, datetime
+from contextlib import asynccontextmanager
 
 from .config import settings
 from . import omdb_client
+from . import omdb_cache
 from . import tmdb_client
 from .persistence_json import (
-    save_movie_meta, load_movie_meta,
-    save_reviews, load_reviews,
-    save_analysis, load_analysis,
+    load_movie_meta,
+    save_reviews, load_reviews, save_reviews_stream,
+    update_analysis, load_analysis, iter_analysis,
+    save_summary, load_summary, summarize_analysis, read_cache_stats,
+    save_rollup, load_rollup, rollup_analysis,
+    save_search_index, load_search_index, analysis_rows,
 )
 from .models import SummaryResponse
-from .sentiment_hf import predict as hf_predict
-
-app = FastAPI(title="Movie Sentiment Analyzer — COMPLETE")
+from .rollups import INTERVALS
+from .search_index import SearchIndex, search_parts, tokenize
+from .analysis import analyze_reviews
+from . import exports
+from .batching import predict_text
+from .adaptive import PRIORITIES
+from .ingest import iter_upload_rows
+from .sentiment_hf import cache_stats as hf_cache_stats, readiness, start_warm_up
+from . import http_client
+from . import jobs
+from . import bulk
+from . import mock_reviews
+from . import metrics
+from . import dedup
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs.resume_pending()
+    if settings.PRELOAD_MODEL:
+        start_warm_up()
+    yield
+    await http_client.aclose()
+
+app = FastAPI(title="Movie Sentiment Analyzer — COMPLETE", lifespan=lifespan)
+app.add_middleware(metrics.LatencyMiddleware)
 
 # Serve frontend
 frontend_path = os.path.join(os.path.dirname(__file__), "..", "frontend")
@@ -31,22 +59,25 @@ def index():
 def health():
     return {"ok": True}
 
+@app.get("/api/ready")
+def ready():
+    # Readiness (vs. /api/health liveness): 503 until the preloaded model is warm
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
 # -------- Movies (OMDb) --------
 @app.get("/api/movies/search")
-def movie_search(query: str):
+async def movie_search(query: str):
     try:
-        data = omdb_client.search_movies(query)
+        data = await omdb_cache.search_movies(query)
         return data
     except omdb_client.OMDbUnavailable as e:
         raise HTTPException(status_code=503, detail=str(e))
 
 @app.get("/api/movies/{imdb_id}")
-def movie_get(imdb_id: str):
+async def movie_get(imdb_id: str):
     try:
-        data = omdb_client.get_movie_by_id(imdb_id)
-        if data.get("Response") == "True":
-            save_movie_meta(imdb_id, data)
-        return data
+        return await omdb_cache.get_movie_by_id(imdb_id)
     except omdb_client.OMDbUnavailable as e:
         cached = load_movie_meta(imdb_id)
         if cached:
@@ -56,37 +87,25 @@ def movie_get(imdb_id: str):
 # -------- Reviews: upload / sample / generate --------
 @app.post("/api/reviews/{imdb_id}/upload")
 async def reviews_upload(imdb_id: str, file: UploadFile | None = File(default=None)):
-    texts: List[Dict[str, Any]] = []
     if file is None:
         raise HTTPException(400, "Please upload a CSV or JSON file, or use /use-sample")
 
-    content = await file.read()
-    name = (file.filename or "").lower()
+    # Parse and store incrementally so large dumps never sit in memory;
+    # repeated rows within the file are dropped on the way
+    index = dedup.new_index(imdb_id)
     try:
-        if name.endswith(".csv"):
-            s = content.decode("utf-8", errors="ignore")
-            reader = csv.DictReader(io.StringIO(s))
-            for row in reader:
-                texts.append({"text": row.get("text",""), "source": row.get("source"), "timestamp": row.get("timestamp")})
-        else:
-            data = json.loads(content.decode("utf-8", errors="ignore"))
-            if isinstance(data, list):
-                for r in data:
-                    texts.append({
-                        "text": r.get("text",""),
-                        "source": r.get("source"),
-                        "timestamp": r.get("timestamp")
-                    })
-            else:
-                raise ValueError("JSON must be a list of review objects")
-    except Exception as e:
-        raise HTTPException(400, f"Failed to parse file: {e}")
-
-    texts = [t for t in texts if t.get("text")]
-    if not texts:
-        raise HTTPException(400, "No valid reviews found")
-    save_reviews(imdb_id, texts)
-    return {"ok": True, "count": len(texts)}
+        rows = index.filter(iter_upload_rows(file.file, file.filename))
+        try:
+            count = await run_in_threadpool(save_reviews_stream, imdb_id, rows)
+        except (ValueError, csv.Error) as e:
+            raise HTTPException(400, f"Failed to parse file: {e}")
+
+        if not count:
+            raise HTTPException(400, "No valid reviews found")
+        await run_in_threadpool(dedup.save_index, imdb_id, index)
+    finally:
+        index.close()
+    return {"ok": True, "count": count, "skipped": index.skipped}
 
 @app.post("/api/reviews/{imdb_id}/use-sample")
 def reviews_use_sample(imdb_id: str):
@@ -99,71 +118,29 @@ def reviews_use_sample(imdb_id: str):
 
 @app.post("/api/reviews/{imdb_id}/generate")
 def reviews_generate(imdb_id: str, count: int = 40):
-    pos_templates = [
-        "Amazing movie with stunning visuals!",
-        "Great acting and beautiful score.",
-        "Loved it, a must watch.",
-        "Fantastic world-building and direction.",
-        "I enjoyed every minute!"
-    ]
-    neg_templates = [
-        "Boring and too slow.",
-        "I hate the pacing, overhyped.",
-        "Terrible writing and confusing plot.",
-        "Awful experience, not worth it.",
-        "Disappointing and dull."
-    ]
-    neu_templates = [
-        "It was okay, nothing special.",
-        "Fine movie with some good moments.",
-        "Average overall.",
-        "Mixed feelings about it.",
-        "Neutral on this one."
-    ]
-
-    import random
-    rows: List[Dict[str, Any]] = []
-    n_pos = max(1, int(count * 0.4))
-    n_neg = max(1, int(count * 0.3))
-    n_neu = max(1, count - n_pos - n_neg)
-
-    def mk(templates, n):
-        out = []
-        for _ in range(n):
-            t = random.choice(templates)
-            ts = datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
-            out.append({"text": t, "source": "mock", "timestamp": ts})
-        return out
-
-    rows.extend(mk(pos_templates, n_pos))
-    rows.extend(mk(neg_templates, n_neg))
-    rows.extend(mk(neu_templates, n_neu))
-
+    rows = mock_reviews.generate(count)
     save_reviews(imdb_id, rows)
     return {"ok": True, "count": len(rows), "note": "mock reviews generated"}
 
 # -------- Reviews: import from TMDb --------
 @app.post("/api/reviews/{imdb_id}/import/tmdb")
-def reviews_import_tmdb(imdb_id: str, max_pages: int = 1):
+async def reviews_import_tmdb(imdb_id: str, max_pages: int = 1):
     try:
-        tmdb_id = tmdb_client.find_tmdb_id_by_imdb(imdb_id)
+        tmdb_id = await tmdb_client.find_tmdb_id_by_imdb(imdb_id)
         if not tmdb_id:
             return {"ok": False, "count": 0, "msg": "Not found on TMDb"}
         rows: List[Dict[str, Any]] = []
-        for page in range(1, max_pages + 1):
-            for r in tmdb_client.fetch_reviews_by_tmdb_id(tmdb_id, page=page):
-                rows.append({
-                    "text": r.get("content",""),
-                    "source": f"tmdb:{r.get('author','')}",
-                    "timestamp": r.get("created_at")
-                })
+        for r in await tmdb_client.fetch_review_pages(tmdb_id, max_pages):
+            rows.append({
+                "text": r.get("content",""),
+                "source": f"tmdb:{r.get('author','')}",
+                "timestamp": r.get("created_at")
+            })
         if not rows:
             return {"ok": True, "count": 0, "msg": "No reviews on TMDb"}
-        # Merge into existing reviews (do not overwrite)
-        existing = load_reviews(imdb_id) or []
-        merged = existing + rows
-        save_reviews(imdb_id, merged)
-        return {"ok": True, "count": len(rows), "total": len(merged)}
+        # Append to existing reviews (do not overwrite); already imported ones are skipped
+        added, skipped, total = await run_in_threadpool(dedup.append_unique, imdb_id, rows)
+        return {"ok": True, "count": len(added), "skipped": skipped, "total": total}
     except tmdb_client.TMDbUnavailable as e:
         raise HTTPException(503, str(e))
     except Exception as e:
@@ -171,83 +148,159 @@ def reviews_import_tmdb(imdb_id: str, max_pages: int = 1):
 
 # -------- Analyze / Summary --------
 @app.post("/api/analyze/{imdb_id}")
-def analyze(imdb_id: str):
+def analyze(imdb_id: str, full: bool = False, background: bool = False):
+    if background:
+        return jobs.submit(imdb_id, full)
     reviews = load_reviews(imdb_id)
     if not reviews:
         raise HTTPException(404, "No reviews uploaded/imported for this movie")
 
-    texts = [r.get("text","") for r in reviews]
-    preds = hf_predict(texts)
-
-    rows: List[Dict[str, Any]] = []
-    for r, p in zip(reviews, preds):
-        rows.append({
-            "text": r.get("text",""),
-            "source": r.get("source"),
-            "timestamp": r.get("timestamp"),
-            "label": p["label"],
-            "score": float(p["score"]),
-        })
-    save_analysis(imdb_id, rows)
-    return {"ok": True, "count": len(rows)}
+    # Only new or changed reviews are scored; ?full=true re-scores everything
+    previous = None if full else load_analysis(imdb_id)
+    rows, stats = analyze_reviews(reviews, previous)
+    update_analysis(imdb_id, rows, full)
+    return {"ok": True, "count": len(rows), **stats}
+
+@app.post("/api/analyze-bulk")
+def analyze_bulk(payload: dict):
+    # Pools the unscored reviews of all movies into shared model batches
+    imdb_ids = payload.get("imdb_ids")
+    if not isinstance(imdb_ids, list) or not imdb_ids or not all(isinstance(i, str) for i in imdb_ids):
+        raise HTTPException(400, "imdb_ids must be a non-empty list of ids")
+    return bulk.analyze_movies(imdb_ids, full=bool(payload.get("full", False)))
+
+# -------- Background analysis jobs --------
+@app.post("/api/jobs/analyze/{imdb_id}")
+def analyze_job(imdb_id: str, full: bool = False):
+    return jobs.submit(imdb_id, full)
+
+@app.get("/api/jobs/{job_id}")
+def job_status(job_id: str):
+    state = jobs.get(job_id)
+    if state is None:
+        raise HTTPException(404, "Job not found")
+    return state
+
+@app.get("/api/jobs/{job_id}/events")
+def job_events(job_id: str, request: Request):
+    if jobs.get(job_id) is None:
+        raise HTTPException(404, "Job not found")
+    last = request.headers.get("last-event-id", "0")
+    return StreamingResponse(
+        jobs.events(job_id, int(last) if last.isdigit() else 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
 @app.get("/api/summary/{imdb_id}", response_model=SummaryResponse)
 def summary(imdb_id: str):
-    rows = load_analysis(imdb_id)
-    if not rows:
+    # Materialized when analysis is saved; legacy analyses are aggregated once here
+    agg = load_summary(imdb_id)
+    if agg is None:
+        agg = summarize_analysis(imdb_id)
+        if agg is not None:
+            save_summary(imdb_id, agg)
+    if agg is None or not agg.total:
         raise HTTPException(404, "No analysis found; run /api/analyze first")
+    return agg.response(imdb_id)
+
+@app.get("/api/trend/{imdb_id}")
+def trend(imdb_id: str, interval: str = "day", source: str | None = None):
+    # Served from the day/week/month rollups kept next to the summary
+    if interval not in INTERVALS:
+        raise HTTPException(400, f"interval must be one of: {', '.join(INTERVALS)}")
+    rollup = load_rollup(imdb_id)
+    if rollup is None:
+        rollup = rollup_analysis(imdb_id)
+        if rollup is not None:
+            save_rollup(imdb_id, rollup)
+    if rollup is None:
+        raise HTTPException(404, "No analysis found; run /api/analyze first")
+    return {"imdb_id": imdb_id, **rollup.series(interval, source or None)}
 
-    total = len(rows)
-    pos = sum(1 for r in rows if r["label"].upper().startswith("POS"))
-    neg = sum(1 for r in rows if r["label"].upper().startswith("NEG"))
-    neu = total - pos - neg
-    avg = sum(r.get("score", 0.0) for r in rows) / total if total else 0.0
-
-    top_pos = sorted([r for r in rows if r["label"].upper().startswith("POS")], key=lambda x: x.get("score",0), reverse=True)[:5]
-    top_neg = sorted([r for r in rows if r["label"].upper().startswith("NEG")], key=lambda x: x.get("score",0), reverse=True)[:5]
-
+@app.get("/api/analysis/{imdb_id}")
+def get_analysis(
+    imdb_id: str,
+    cursor: int = 0,
+    limit: int | None = None,
+    label: str | None = None,
+    min_score: float | None = None,
+    max_score: float | None = None,
+):
+    rows = iter_analysis(imdb_id, start=cursor)
+    found = False
+    if rows is not None:
+        found, rows = exports.peek(rows)
+    # a cursor past the end gives an empty page, but only for an existing analysis
+    if rows is None or (not found and not cursor):
+        raise HTTPException(404, "No analysis found; run /api/analyze first")
+    filters = {"label": label, "min_score": min_score, "max_score": max_score}
+    if limit is None:
+        # Whole analysis, streamed row by row instead of built in memory
+        selected = (r for r in rows if exports.matches(r, **filters))
+        return StreamingResponse(exports.json_rows_chunks(imdb_id, selected), media_type="application/json")
+    page_rows, next_cursor = exports.page(rows, cursor, max(1, limit), **filters)
+    return {"imdb_id": imdb_id, "rows": page_rows, "next_cursor": next_cursor}
+
+@app.get("/api/search/{imdb_id}")
+def search_reviews(
+    imdb_id: str,
+    q: str,
+    label: str | None = None,
+    min_score: float | None = None,
+    cursor: int = 0,
+    limit: int = 20,
+):
+    # Ranked keyword search over the per-movie inverted index
+    if not tokenize(q):
+        raise HTTPException(400, "Query has no searchable words")
+    parts = load_search_index(imdb_id)
+    if parts is None:
+        rows = load_analysis(imdb_id)
+        if rows:
+            index = SearchIndex.from_rows(rows)
+            save_search_index(imdb_id, index)
+            parts = [index]
+    if parts is None:
+        raise HTTPException(404, "No analysis found; run /api/analyze first")
+    hits = search_parts(parts, q, label=label, min_score=min_score)
+    start, limit = max(0, cursor), max(1, limit)
+    page_hits = hits[start:start + limit]
+    rows = analysis_rows(imdb_id, [pos for pos, _ in page_hits])
     return {
         "imdb_id": imdb_id,
-        "total": total,
-        "positives": pos,
-        "negatives": neg,
-        "neutral": neu,
-        "positivity_ratio": round(pos/total, 4) if total else 0.0,
-        "avg_confidence": round(avg, 4),
-        "top_positive_quotes": [t["text"] for t in top_pos],
-        "top_negative_quotes": [t["text"] for t in top_neg],
+        "query": q,
+        "total": len(hits),
+        "hits": [{"position": pos, "rank": round(rank, 4), **row} for (pos, rank), row in zip(page_hits, rows)],
+        "next_cursor": start + limit if start + limit < len(hits) else None,
     }
 
-@app.get("/api/analysis/{imdb_id}")
-def get_analysis(imdb_id: str):
-    rows = load_analysis(imdb_id)
-    if not rows:
-        raise HTTPException(404, "No analysis found; run /api/analyze first")
-    return {"imdb_id": imdb_id, "rows": rows}
-
+def _export_rows(imdb_id: str):
+    found, rows = exports.peek(iter_analysis(imdb_id))
+    if not found:
+        raise HTTPException(404, "No analysis to export")
+    return rows
 
 @app.get("/api/export/{imdb_id}.csv")
 def export_csv(imdb_id: str):
-    rows = load_analysis(imdb_id)
-    if not rows:
-        raise HTTPException(404, "No analysis to export")
-
-    fieldnames = ["text","source","timestamp","label","score"]
-    buf = io.StringIO()
-    writer = csv.DictWriter(buf, fieldnames=fieldnames)
-    writer.writeheader()
-    for r in rows:
-        writer.writerow({k: r.get(k,"") for k in fieldnames})
-
-    data = buf.getvalue().encode("utf-8")
-    return Response(
-        content=data,
+    return StreamingResponse(
+        exports.csv_chunks(_export_rows(imdb_id)),
         media_type="text/csv",
         headers={
             "Content-Disposition": f'attachment; filename="{imdb_id}_analysis.csv"'
         }
     )
 
+@app.get("/api/export/{imdb_id}.ndjson")
+def export_ndjson(imdb_id: str):
+    return StreamingResponse(
+        exports.ndjson_chunks(_export_rows(imdb_id)),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="{imdb_id}_analysis.ndjson"'
+        }
+    )
+
 # -------- Reviews: add single comment --------
 @app.post("/api/reviews/{imdb_id}/add")
 def reviews_add(imdb_id: str, payload: dict):
@@ -256,18 +309,30 @@ def reviews_add(imdb_id: str, payload: dict):
     if not text:
         raise HTTPException(400, "Missing 'text'")
 
-    existing = load_reviews(imdb_id) or []
     ts = datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
     new_item = {"text": text, "source": source or "user", "timestamp": ts}
-    existing.append(new_item)
-    save_reviews(imdb_id, existing)
-    return {"ok": True, "count": len(existing), "added": new_item}
+    added, skipped, count = dedup.append_unique(imdb_id, [new_item])
+    return {"ok": True, "count": count, "added": added[0] if added else None, "skipped": skipped}
 
 # Single text analysis (no persistence)
 @app.post("/api/analyze-text")
-def analyze_text(payload: dict):
+async def analyze_text(payload: dict):
     text = payload.get("text", "")
     if not text.strip():
         raise HTTPException(400, "Missing 'text'")
-    pred = hf_predict([text])[0]
-    return {"label": pred["label"], "score": pred["score"]}
+    # Previews are low priority: under load they may be answered by the lexicon
+    # scorer, as reported in "engine"/"degraded"
+    priority = payload.get("priority", "low")
+    if priority not in PRIORITIES:
+        raise HTTPException(400, f"priority must be one of: {', '.join(PRIORITIES)}")
+    # Concurrent requests are coalesced into one batched forward pass
+    pred = await predict_text(text, priority)
+    return {"label": pred["label"], "score": pred["score"], "engine": pred["engine"], "degraded": pred["degraded"]}
+
+@app.get("/api/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/api/cache/stats")
+def prediction_cache_stats():
+    return {**hf_cache_stats(), "omdb": omdb_cache.stats(), "reads": read_cache_stats()}
@@ -0,0 +1,105 @@
+from __future__ import annotations
+import asyncio
+from typing import Any, Callable, Dict, List, Tuple
+
+from .config import settings
+from . import adaptive, metrics, sentiment_hf
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one batched call.
+
+    Callers `await submit(item)`; a worker task gathers items for up to
+    `max_wait_ms` (or until `max_batch` items are queued), runs `fn` once on
+    the whole batch in a worker thread and fans the results back out. Batches
+    run one at a time, so requests arriving during a forward pass simply form
+    the next, larger batch.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[Tuple[Any, asyncio.Future]] | None = None
+        self._task: asyncio.Task | None = None
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._worker(self._queue))
+        return self._queue
+
+    async def submit(self, item: Any) -> Any:
+        queue = self._ensure_worker()
+        fut = asyncio.get_running_loop().create_future()
+        await queue.put((item, fut))
+        return await fut
+
+    async def _collect(self, queue: asyncio.Queue) -> List[Tuple[Any, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # take whatever else is already waiting, up to the batch limit
+        while len(batch) < self.max_batch and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect(queue)
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.fn, items)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+
+def _predict_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    preds, engine = sentiment_hf.predict_with_engine(texts)
+    return [dict(p, engine=engine) for p in preds]
+
+
+text_batcher = MicroBatcher(
+    _predict_batch,
+    max_batch=settings.MICROBATCH_MAX_SIZE,
+    max_wait_ms=settings.MICROBATCH_MAX_WAIT_MS,
+)
+
+
+async def predict_text(text: str, priority: str = "low") -> Dict[str, Any]:
+    """Score one text, sharing a forward pass with concurrent callers.
+
+    The result carries the `engine` that produced it and, when the adaptive
+    router sent it to the lexicon scorer instead of the model, the reason in
+    `degraded` (None otherwise).
+    """
+    reason = adaptive.router.route(priority) if settings.ADAPTIVE_ROUTING else None
+    if reason:
+        metrics.DEGRADED.inc(reason=reason)
+        metrics.PREDICTED_TEXTS.inc(engine="lexicon")
+        return dict(sentiment_hf._fallback_predict([text])[0], engine="lexicon", degraded=reason)
+    with adaptive.router.track():
+        if not settings.MICROBATCH_ENABLED:
+            loop = asyncio.get_running_loop()
+            pred = (await loop.run_in_executor(None, _predict_batch, [text]))[0]
+        else:
+            pred = await text_batcher.submit(text)
+    return dict(pred, degraded=None)
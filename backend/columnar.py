@@ -0,0 +1,270 @@
+from __future__ import annotations
+import heapq
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from .locks import path_lock
+from .summary import TOP_K, SummaryAggregate
+
+# Columnar analysis store: one directory per movie holding
+#   labels.u8    label codes (uint8), indexing meta["labels"]
+#   scores.f32   scores (float32)
+#   <col>.bin    UTF-8 values of a string column, back to back
+#   <col>.end    int64 end offset of each value in <col>.bin
+#   <col>.nul    uint8 1 where the value is None
+#   meta.json    row count, label names and blob sizes; rewritten last, so it
+#                is the commit point and bytes past it are ignored
+# Everything is memory-mapped on read; label/score aggregates never touch text.
+STR_COLS = ("review_id", "text", "source", "timestamp", "extra")
+_KNOWN = frozenset(STR_COLS[:-1]) | {"label", "score"}
+META = "meta.json"
+# Scores are float32; rounding to 7 digits gives back 0.85 rather than 0.8500000238
+SCORE_DIGITS = 7
+_CHUNK = 4096
+
+
+def _read_meta(path: Path) -> Dict[str, Any]:
+    return json.loads((path / META).read_text(encoding="utf-8"))
+
+
+def _tmp_suffix() -> str:
+    return f"{os.getpid()}-{threading.get_ident()}"
+
+
+def _write_meta(path: Path, meta: Dict[str, Any]) -> None:
+    tmp = path / f"{META}.tmp{_tmp_suffix()}"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, path / META)
+
+
+def _split(row: Dict[str, Any]) -> Dict[str, Any]:
+    """String column values of a row; anything else goes to the JSON "extra" column."""
+    values: Dict[str, Any] = {}
+    extra = {k: v for k, v in row.items() if k not in _KNOWN}
+    for col in STR_COLS[:-1]:
+        v = row.get(col)
+        if v is None or isinstance(v, str):
+            values[col] = v
+        else:
+            extra[col] = v  # keep non-string values (e.g. numeric timestamps) exact
+            values[col] = None
+    values["extra"] = json.dumps(extra, ensure_ascii=False) if extra else None
+    return values
+
+
+def _truncate(path: Path, meta: Dict[str, Any]) -> None:
+    # drop bytes of an append that never reached meta.json
+    n = meta["n"]
+    sizes = {"labels.u8": n, "scores.f32": 4 * n}
+    for col in STR_COLS:
+        sizes.update({f"{col}.end": 8 * n, f"{col}.nul": n, f"{col}.bin": meta["blob"][col]})
+    for name, size in sizes.items():
+        p = path / name
+        if p.stat().st_size != size:
+            os.truncate(p, size)
+
+
+def _append_files(path: Path, meta: Dict[str, Any], rows: List[Dict[str, Any]]) -> None:
+    names: List[str] = meta["labels"]
+    code_of = {name: i for i, name in enumerate(names)}
+    codes = np.empty(len(rows), dtype=np.uint8)
+    scores = np.empty(len(rows), dtype=np.float32)
+    parts: Dict[str, List[bytes]] = {col: [] for col in STR_COLS}
+    ends: Dict[str, List[int]] = {col: [] for col in STR_COLS}
+    nuls: Dict[str, bytearray] = {col: bytearray(len(rows)) for col in STR_COLS}
+    pos = dict(meta["blob"])
+    for i, row in enumerate(rows):
+        label = row.get("label") or ""
+        if label not in code_of:
+            if len(names) >= 255:
+                raise ValueError("too many distinct labels for the columnar format")
+            code_of[label] = len(names)
+            names.append(label)
+        codes[i] = code_of[label]
+        scores[i] = row.get("score", 0.0)
+        for col, v in _split(row).items():
+            if v is None:
+                nuls[col][i] = 1
+            else:
+                b = v.encode("utf-8")
+                parts[col].append(b)
+                pos[col] += len(b)
+            ends[col].append(pos[col])
+
+    with open(path / "labels.u8", "ab") as f:
+        f.write(codes.tobytes())
+    with open(path / "scores.f32", "ab") as f:
+        f.write(scores.tobytes())
+    for col in STR_COLS:
+        with open(path / f"{col}.bin", "ab") as f:
+            f.write(b"".join(parts[col]))
+        with open(path / f"{col}.end", "ab") as f:
+            f.write(np.asarray(ends[col], dtype=np.int64).tobytes())
+        with open(path / f"{col}.nul", "ab") as f:
+            f.write(bytes(nuls[col]))
+    meta["n"] += len(rows)
+    meta["blob"] = pos
+
+
+def _lock_path(path: Path, lock: Path | None) -> Path:
+    return lock if lock is not None else path.with_name(path.name + ".lock")
+
+
+def write(path: Path, rows: Iterable[Dict[str, Any]], lock: Path | None = None) -> None:
+    """Replace the store at `path` with `rows` (built aside, then swapped in).
+
+    `lock` names the path_lock file that serializes changes to the store;
+    by default `<store>.lock` next to it.
+    """
+    tmp = path.with_name(f"{path.name}.tmp{_tmp_suffix()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    try:
+        meta: Dict[str, Any] = {"version": 1, "n": 0, "labels": [], "blob": {col: 0 for col in STR_COLS}}
+        for name in ["labels.u8", "scores.f32"] + [f"{c}.{ext}" for c in STR_COLS for ext in ("bin", "end", "nul")]:
+            (tmp / name).touch()
+        batch: List[Dict[str, Any]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= _CHUNK:
+                _append_files(tmp, meta, batch)
+                batch = []
+        if batch:
+            _append_files(tmp, meta, batch)
+        _write_meta(tmp, meta)
+        # one writer per store at a time (threads and processes); the build
+        # above needs no lock, only the swap does
+        with path_lock(_lock_path(path, lock)):
+            if path.exists():
+                old = path.with_name(f"{path.name}.old{_tmp_suffix()}")
+                os.replace(path, old)
+                os.replace(tmp, path)
+                shutil.rmtree(old, ignore_errors=True)
+            else:
+                os.replace(tmp, path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def append(path: Path, rows: List[Dict[str, Any]], lock: Path | None = None) -> None:
+    """Append rows in place: only the new bytes and meta.json are written."""
+    with path_lock(_lock_path(path, lock)):
+        meta = _read_meta(path)
+        _truncate(path, meta)
+        _append_files(path, meta, rows)
+        _write_meta(path, meta)
+
+
+def _map(path: Path, dtype: Any, count: int) -> np.ndarray:
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class Columns:
+    """Read-only, memory-mapped view of a columnar analysis store."""
+
+    def __init__(self, path: Path, lock: Path | None = None):
+        # Opened without the lock; if write() swapped the directory between
+        # reading meta.json and mapping the files, they may not match it,
+        # so open again holding the lock (which write() takes to swap)
+        ino = os.stat(path).st_ino
+        try:
+            self._open(path)
+            if os.stat(path).st_ino == ino:
+                return
+        except (OSError, ValueError):
+            pass
+        with path_lock(_lock_path(path, lock)):
+            self._open(path)
+
+    def _open(self, path: Path) -> None:
+        meta = _read_meta(path)
+        self.n: int = meta["n"]
+        self.label_names: List[str] = meta["labels"]
+        self.labels = _map(path / "labels.u8", np.uint8, self.n)
+        self.scores = _map(path / "scores.f32", np.float32, self.n)
+        self._ends = {c: _map(path / f"{c}.end", np.int64, self.n) for c in STR_COLS}
+        self._nuls = {c: _map(path / f"{c}.nul", np.uint8, self.n) for c in STR_COLS}
+        self._blobs = {c: _map(path / f"{c}.bin", np.uint8, meta["blob"][c]) for c in STR_COLS}
+
+    def __len__(self) -> int:
+        return self.n
+
+    def value(self, col: str, i: int) -> str | None:
+        if self._nuls[col][i]:
+            return None
+        ends = self._ends[col]
+        start = int(ends[i - 1]) if i else 0
+        return self._blobs[col][start:int(ends[i])].tobytes().decode("utf-8")
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """A single row, in the iter_rows shape."""
+        row = {c: self.value(c, i) for c in STR_COLS[:-1]}
+        row["label"] = self.label_names[self.labels[i]]
+        row["score"] = round(float(self.scores[i]), SCORE_DIGITS)
+        if row["review_id"] is None:
+            del row["review_id"]
+        extra = self.value("extra", i)
+        if extra is not None:
+            row.update(json.loads(extra))
+        return row
+
+    def _values(self, col: str, start: int, stop: int) -> List[str | None]:
+        ends = self._ends[col][start:stop].tolist()
+        nuls = self._nuls[col][start:stop].tolist()
+        lo = int(self._ends[col][start - 1]) if start else 0
+        raw = self._blobs[col][lo:ends[-1] if ends else lo].tobytes()
+        out: List[str | None] = []
+        prev = 0
+        for end, nul in zip(ends, nuls):
+            end -= lo
+            out.append(None if nul else raw[prev:end].decode("utf-8"))
+            prev = end
+        return out
+
+    def iter_rows(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """Rows as dicts (the load_analysis shape), decoded a chunk at a time."""
+        names = self.label_names
+        for lo in range(max(0, start), self.n, _CHUNK):
+            hi = min(lo + _CHUNK, self.n)
+            labels = self.labels[lo:hi].tolist()
+            scores = np.round(self.scores[lo:hi].astype(np.float64), SCORE_DIGITS).tolist()
+            cols = {c: self._values(c, lo, hi) for c in STR_COLS}
+            extras = cols["extra"]
+            for j, (rid, text, source, ts) in enumerate(zip(
+                    cols["review_id"], cols["text"], cols["source"], cols["timestamp"])):
+                row = {"review_id": rid, "text": text, "source": source, "timestamp": ts,
+                       "label": names[labels[j]], "score": scores[j]}
+                if rid is None:
+                    del row["review_id"]
+                if extras[j] is not None:
+                    row.update(json.loads(extras[j]))
+                yield row
+
+    def summary(self) -> SummaryAggregate:
+        """The /api/summary aggregate, computed on the label and score columns;
+        only the few top quotes are decoded."""
+        agg = SummaryAggregate()
+        agg.total = self.n
+        if not self.n:
+            return agg
+        scores = np.round(self.scores.astype(np.float64), SCORE_DIGITS)
+        counts = np.bincount(self.labels, minlength=len(self.label_names))
+        agg.score_sum = float(scores.sum())
+        for prefix, heap_attr, count_attr in (("POS", "top_pos", "positives"), ("NEG", "top_neg", "negatives")):
+            codes = [i for i, name in enumerate(self.label_names) if name.upper().startswith(prefix)]
+            setattr(agg, count_attr, int(counts[codes].sum()) if codes else 0)
+            idx = np.nonzero(np.isin(self.labels, codes))[0] if codes else np.empty(0, dtype=np.int64)
+            # highest score first, earliest row first among ties
+            top = idx[np.lexsort((idx, -scores[idx]))[:TOP_K]]
+            heap = [[float(scores[i]), -int(i), self.value("text", int(i))] for i in top]
+            heapq.heapify(heap)
+            setattr(agg, heap_attr, heap)
+        return agg
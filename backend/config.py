@@ -9,9 +9,92 @@ class Settings(BaseSettings):
     HF_MODEL_NAME: str = Field(
         default="distilbert-base-uncased-finetuned-sst-2-english"
     )
+    # Weighted lexicon for the fallback scorer (default: DATA_DIR/lexicon.json if present)
+    LEXICON_PATH: str = Field(default="")
+    # Load and warm up the model at startup; /api/ready reports 503 until done
+    PRELOAD_MODEL: bool = Field(default=False)
+    # Inference engine: torch | torch-int8 | onnx (see backend/hf_engines.py)
+    HF_ENGINE: str = Field(default="torch")
     DATA_DIR: str = Field(default="backend/data")
     TRAKT_CLIENT_ID: str | None = Field(default=None)
 
+    # Storage backend for movies/reviews/analysis: json (files) | sqlite (WAL)
+    STORAGE_BACKEND: str = Field(default="json")
+    SQLITE_PATH: str = Field(default="")  # default: DATA_DIR/store.sqlite3
+    # On-disk analysis format of the json backend: columnar (memory-mapped
+    # NumPy columns, see backend/columnar.py) | json (one JSON list per movie)
+    ANALYSIS_FORMAT: str = Field(default="columnar")
+    # In-process cache of parsed JSON/analysis reads, bounded by their estimated
+    # in-memory size (0 disables)
+    READ_CACHE_MAX_BYTES: int = Field(default=64 * 1024 * 1024)
+    # Rows appended to a movie's search log before it is merged into the stored
+    # index (or a tenth of the index, if that is more)
+    SEARCH_LOG_MAX_ROWS: int = Field(default=5000)
+
+    # Prediction cache (in-memory LRU + on-disk tier under DATA_DIR/cache)
+    PREDICTION_CACHE_ENABLED: bool = Field(default=True)
+    PREDICTION_CACHE_SIZE: int = Field(default=50_000)
+    PREDICTION_CACHE_DISK: bool = Field(default=True)
+
+    # Length-bucketed batching: padded tokens per forward pass / texts per batch
+    HF_BATCH_TOKEN_BUDGET: int = Field(default=4096)
+    HF_MAX_BATCH_SIZE: int = Field(default=32)
+
+    # Process-pool inference for large jobs (0 workers = disabled)
+    HF_POOL_WORKERS: int = Field(default=0)
+    HF_POOL_SHARD_SIZE: int = Field(default=256)
+    HF_POOL_MIN_TEXTS: int = Field(default=1024)
+    HF_POOL_THREADS_PER_WORKER: int = Field(default=1)
+
+    # Micro-batching of concurrent /api/analyze-text requests
+    MICROBATCH_ENABLED: bool = Field(default=True)
+    MICROBATCH_MAX_WAIT_MS: float = Field(default=5.0)
+    MICROBATCH_MAX_SIZE: int = Field(default=32)
+
+    # Outbound OMDb/TMDb calls: shared keep-alive pool, concurrent TMDb pages
+    HTTP_TIMEOUT: float = Field(default=15.0)
+    HTTP_MAX_CONNECTIONS: int = Field(default=20)
+    TMDB_MAX_CONCURRENCY: int = Field(default=8)
+    # seconds an IMDb id TMDb had no match for is remembered before asking again
+    TMDB_ID_NEGATIVE_TTL: float = Field(default=300.0)
+
+    # OMDb response cache (seconds): fresh TTL per kind, TTL for "not found"
+    # answers, and how long past expiry a stale entry is served while it refreshes
+    OMDB_CACHE_SEARCH_TTL: float = Field(default=3600.0)
+    OMDB_CACHE_MOVIE_TTL: float = Field(default=86400.0)
+    OMDB_CACHE_NEGATIVE_TTL: float = Field(default=300.0)
+    OMDB_CACHE_STALE_TTL: float = Field(default=7 * 86400.0)
+    OMDB_CACHE_SIZE: int = Field(default=2000)
+    # after a failed background refresh, wait this long before the next one,
+    # doubling per consecutive failure up to the max
+    OMDB_CACHE_REFRESH_BACKOFF: float = Field(default=30.0)
+    OMDB_CACHE_REFRESH_BACKOFF_MAX: float = Field(default=900.0)
+
+    # Background analysis jobs (/api/jobs): worker threads, reviews scored per progress step
+    JOBS_MAX_WORKERS: int = Field(default=1)
+    JOBS_CHUNK_SIZE: int = Field(default=256)
+
+    # /api/analyze-bulk: reviews held in memory before a shared scoring pass
+    BULK_GROUP_REVIEWS: int = Field(default=20_000)
+
+    # Ingest dedup: exact content / provider identity always; MinHash near-duplicates
+    # (word 3-grams, estimated Jaccard >= threshold) when enabled
+    DEDUP_MINHASH: bool = Field(default=False)
+    DEDUP_MINHASH_THRESHOLD: float = Field(default=0.9)
+
+    # Adaptive degradation of /api/analyze-text: past ADAPTIVE_MAX_QUEUE queued
+    # requests, or with the p95 latency over the last ADAPTIVE_WINDOW_S seconds
+    # above ADAPTIVE_SLO_MS (low priority only), requests go to the lexicon scorer
+    ADAPTIVE_ROUTING: bool = Field(default=True)
+    ADAPTIVE_SLO_MS: float = Field(default=500.0)
+    ADAPTIVE_MAX_QUEUE: int = Field(default=64)
+    ADAPTIVE_WINDOW_S: float = Field(default=10.0)
+
+    # Pre-fork server (python -m backend.serve): worker processes, and torch
+    # threads per worker (0 = CPU count / workers)
+    SERVE_WORKERS: int = Field(default=2)
+    SERVE_THREADS_PER_WORKER: int = Field(default=0)
+
     class Config:
         env_file = ".env"
 
@@ -21,5 +104,5 @@ settings = Settings()
 
 # Ensure data dirs exist
 base = Path(settings.DATA_DIR)
-for sub in ["movies", "reviews", "analysis", "samples"]:
+for sub in ["movies", "reviews", "analysis", "summaries", "samples", "cache", "jobs"]:
     (base / sub).mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,224 @@
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from .config import settings
+from .persistence_json import append_reviews, load_reviews, dedup_index_path, dedup_lock
+
+# Per-movie index of the reviews already stored, checked at ingest so that
+# repeated imports only append what is new. Kept in a SQLite file per movie
+# (persistence_json.dedup_index_path) so that checking a review is a key
+# lookup rather than loading every hash; persistence_json drops the file
+# whenever a movie's reviews are replaced, and it is rebuilt from the stored
+# reviews on next use.
+
+# MinHash near-duplicate detection (DEDUP_MINHASH): NUM_PERM hash functions,
+# banded BANDS x ROWS for candidate lookup, then verified on the signature
+NUM_PERM = 32
+BANDS, ROWS = 8, 4
+_PRIME = (1 << 31) - 1
+
+
+def content_key(text: str) -> str:
+    """Hash of the text with case and whitespace normalized away."""
+    return hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()[:16]
+
+
+def identity_key(review: Dict[str, Any]) -> str | None:
+    """Provider identity: an author-qualified source ("tmdb:<author>") plus timestamp.
+
+    Plain sources ("user", "mock", "imdb") do not identify an author, so
+    those rows are matched on content only.
+    """
+    source, ts = review.get("source"), review.get("timestamp")
+    if not source or not ts or ":" not in str(source):
+        return None
+    return f"{source}\x1f{ts}"
+
+
+_perm: Tuple[Any, Any] | None = None
+
+
+def minhash(text: str) -> str:
+    """MinHash signature of the text's word 3-grams, as a hex string."""
+    import numpy as np
+
+    global _perm
+    if _perm is None:
+        rng = np.random.default_rng(20240501)
+        _perm = (rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64),
+                 rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64))
+    a, b = _perm
+    words = text.lower().split()
+    shingles = {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+    h = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    sig = ((h[:, None] * a + b) % _PRIME).min(axis=0)
+    return "".join(f"{int(v):08x}" for v in sig)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS info (minhash INTEGER NOT NULL, size INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS hashes (key TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS idents (key TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS signatures (id INTEGER PRIMARY KEY, sig TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS bands (band TEXT NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (band, id)) WITHOUT ROWID;
+"""
+
+
+class DedupIndex:
+    """Content hashes, provider identities and optional MinHash signatures.
+
+    Backed by the SQLite file at `path` (in memory if None). Recorded reviews
+    are visible to later checks right away but only persist on commit();
+    a scratch index also deletes its file on close unless save_index()
+    installed it.
+    """
+
+    def __init__(self, path: Path | None = None, use_minhash: bool | None = None, scratch: bool = False):
+        self.path = path
+        self.scratch = scratch
+        self.skipped = 0
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path) if path else ":memory:", check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        row = self._conn.execute("SELECT minhash, size FROM info").fetchone()
+        if row is None:
+            self.use_minhash = settings.DEDUP_MINHASH if use_minhash is None else use_minhash
+            self.size = 0
+            self._conn.execute("INSERT INTO info VALUES (?, 0)", (int(self.use_minhash),))
+            self._conn.commit()
+        else:
+            self.use_minhash, self.size = bool(row[0]), row[1]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], use_minhash: bool | None = None,
+                  path: Path | None = None, scratch: bool = False) -> "DedupIndex":
+        index = cls(path, use_minhash, scratch)
+        for r in rows:
+            index.record(r)
+        return index
+
+    def _band_keys(self, sig: str) -> List[str]:
+        width = 8 * ROWS
+        return [f"{i}:{sig[i * width:(i + 1) * width]}" for i in range(BANDS)]
+
+    def _has(self, table: str, key: str) -> bool:
+        return self._conn.execute(f"SELECT 1 FROM {table} WHERE key = ?", (key,)).fetchone() is not None
+
+    def _near_duplicate(self, sig: str) -> bool:
+        need = settings.DEDUP_MINHASH_THRESHOLD * NUM_PERM
+        keys = self._band_keys(sig)
+        candidates = self._conn.execute(
+            "SELECT sig FROM signatures WHERE id IN"
+            f" (SELECT id FROM bands WHERE band IN ({','.join('?' * len(keys))}))", keys)
+        for (other,) in candidates:
+            same = sum(sig[k:k + 8] == other[k:k + 8] for k in range(0, 8 * NUM_PERM, 8))
+            if same >= need:
+                return True
+        return False
+
+    def record(self, review: Dict[str, Any], sig: str | None = None) -> None:
+        text = review.get("text") or ""
+        self.size += 1
+        self._conn.execute("INSERT OR IGNORE INTO hashes VALUES (?)", (content_key(text),))
+        ident = identity_key(review)
+        if ident:
+            self._conn.execute("INSERT OR IGNORE INTO idents VALUES (?)", (ident,))
+        if self.use_minhash:
+            sig = sig or minhash(text)
+            sig_id = self._conn.execute("INSERT INTO signatures (sig) VALUES (?)", (sig,)).lastrowid
+            self._conn.executemany("INSERT OR IGNORE INTO bands VALUES (?, ?)",
+                                   [(key, sig_id) for key in self._band_keys(sig)])
+
+    def add(self, review: Dict[str, Any]) -> bool:
+        """Record the review and return True, or return False if it is a duplicate."""
+        text = review.get("text") or ""
+        ident = identity_key(review)
+        sig = minhash(text) if self.use_minhash else None
+        if (self._has("hashes", content_key(text)) or (ident and self._has("idents", ident))
+                or (sig and self._near_duplicate(sig))):
+            self.skipped += 1
+            return False
+        self.record(review, sig)
+        return True
+
+    def filter(self, rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        return (r for r in rows if self.add(r))
+
+    def commit(self) -> None:
+        self._conn.execute("UPDATE info SET size = ?", (self.size,))
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the file, dropping anything not committed."""
+        self._conn.close()
+        if self.scratch and self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+def new_index(imdb_id: str) -> DedupIndex:
+    """Empty scratch index for the movie, to be installed with save_index()."""
+    final = dedup_index_path(imdb_id)
+    final.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=final.parent, prefix=f"{final.name}.", suffix=".part")
+    os.close(fd)
+    return DedupIndex(Path(tmp), scratch=True)
+
+
+def _install(imdb_id: str, index: DedupIndex) -> None:
+    # caller holds dedup_lock(imdb_id)
+    index.commit()
+    index._conn.close()
+    if index.path != dedup_index_path(imdb_id):
+        os.replace(index.path, dedup_index_path(imdb_id))
+    index.scratch = False
+
+
+def load_index(imdb_id: str) -> DedupIndex:
+    """The movie's index, rebuilt from its stored reviews if missing or built
+    with another DEDUP_MINHASH setting. Caller holds dedup_lock(imdb_id)."""
+    path = dedup_index_path(imdb_id)
+    if path.exists():
+        index = DedupIndex(path)
+        if index.use_minhash == settings.DEDUP_MINHASH:
+            return index
+        index.close()
+    index = new_index(imdb_id)
+    try:
+        for r in load_reviews(imdb_id) or []:
+            index.record(r)
+        _install(imdb_id, index)
+    finally:
+        index.close()
+    return DedupIndex(path)
+
+
+def save_index(imdb_id: str, index: DedupIndex) -> None:
+    """Commit the index and make it the movie's own (replacing any other)."""
+    with dedup_lock(imdb_id):
+        _install(imdb_id, index)
+
+
+def append_unique(imdb_id: str, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Append the reviews not already stored for the movie.
+
+    Returns (appended rows, skipped count, total stored). When nothing is new,
+    neither the reviews nor the index are written.
+    """
+    with dedup_lock(imdb_id):
+        index = load_index(imdb_id)
+        try:
+            fresh = list(index.filter(rows))
+            if not fresh:
+                return [], index.skipped, index.size
+            total = append_reviews(imdb_id, fresh)
+            index.commit()
+            return fresh, index.skipped, total
+        finally:
+            index.close()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+import csv
+import io
+import itertools
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+CSV_FIELDS = ["text", "source", "timestamp", "label", "score"]
+# rows serialized per chunk handed to the streaming response
+CHUNK_ROWS = 500
+
+
+def _dumps(obj: Any) -> str:
+    # same encoding as Starlette's JSONResponse
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def _batches(rows: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    it = iter(rows)
+    while batch := list(itertools.islice(it, CHUNK_ROWS)):
+        yield batch
+
+
+def peek(rows: Iterator[Dict[str, Any]] | None) -> Tuple[bool, Iterator[Dict[str, Any]]]:
+    """Whether `rows` yields anything, plus an iterator that still yields everything."""
+    for first in rows or ():
+        return True, itertools.chain([first], rows)
+    return False, iter(())
+
+
+def matches(row: Dict[str, Any], label: str | None, min_score: float | None, max_score: float | None) -> bool:
+    if label and row.get("label", "").upper() != label.upper():
+        return False
+    score = row.get("score", 0.0)
+    if min_score is not None and score < min_score:
+        return False
+    if max_score is not None and score > max_score:
+        return False
+    return True
+
+
+def page(rows: Iterable[Dict[str, Any]], start: int, limit: int, **filters: Any) -> Tuple[List[Dict[str, Any]], int | None]:
+    """Up to `limit` matching rows and the cursor to continue from (None at the end).
+
+    `rows` must begin at position `start`; the cursor is the position of the
+    first row not yet scanned.
+    """
+    out: List[Dict[str, Any]] = []
+    pos = start
+    for row in rows:
+        if len(out) == limit:
+            return out, pos
+        pos += 1
+        if matches(row, **filters):
+            out.append(row)
+    return out, None
+
+
+def csv_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for n, r in enumerate(rows, start=1):
+        writer.writerow({k: r.get(k, "") for k in CSV_FIELDS})
+        if n % CHUNK_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def ndjson_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    for batch in _batches(rows):
+        yield "".join(_dumps(r) + "\n" for r in batch).encode("utf-8")
+
+
+def json_rows_chunks(imdb_id: str, rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """`{"imdb_id": ..., "rows": [...]}` streamed row by row."""
+    yield ('{"imdb_id":' + _dumps(imdb_id) + ',"rows":[').encode("utf-8")
+    first = True
+    for batch in _batches(rows):
+        body = ",".join(_dumps(r) for r in batch)
+        yield (("" if first else ",") + body).encode("utf-8")
+        first = False
+    yield b"]}"
@@ -0,0 +1,127 @@
+"""Inference engines for the sentiment pipeline.
+
+Each loader returns a transformers `pipeline` callable for the same model:
+
+- ``torch``       fp32 PyTorch (the default)
+- ``torch-int8``  PyTorch with dynamic int8 quantization of the Linear layers
+- ``onnx``        ONNX Runtime through ``optimum`` (optional dependency)
+
+Converted models are written once under ``DATA_DIR/models/<engine>/`` and
+reused on later starts.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from .config import settings
+
+ENGINES = ("torch", "torch-int8", "onnx")
+
+
+def engine_dir(engine: str, model_name: str) -> Path:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name)
+    return Path(settings.DATA_DIR) / "models" / engine / slug
+
+
+def _pipeline(**kwargs):
+    from transformers import pipeline
+    return pipeline("sentiment-analysis", device=-1, truncation=True, **kwargs)
+
+
+def load_torch(model_name: str):
+    return _pipeline(model=model_name)
+
+
+def load_torch_int8(model_name: str):
+    import torch
+    from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+
+    def quantize(model):
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    # only tensors are stored, so loading never unpickles arbitrary objects
+    path = engine_dir("torch-int8", model_name) / "state_dict.pt"
+    if path.exists():
+        # same architecture, quantized, then filled with the saved weights
+        model = quantize(AutoModelForSequenceClassification.from_config(AutoConfig.from_pretrained(model_name)))
+        model.load_state_dict(torch.load(path, weights_only=True))
+    else:
+        model = quantize(AutoModelForSequenceClassification.from_pretrained(model_name))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        torch.save(model.state_dict(), tmp)
+        os.replace(tmp, path)
+    model.eval()
+    return _pipeline(model=model, tokenizer=AutoTokenizer.from_pretrained(model_name))
+
+
+def load_onnx(model_name: str):
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer
+
+    path = engine_dir("onnx", model_name)
+    if (path / "model.onnx").exists():
+        model = ORTModelForSequenceClassification.from_pretrained(path)
+        tokenizer = AutoTokenizer.from_pretrained(path)
+    else:
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model.save_pretrained(path)
+        tokenizer.save_pretrained(path)
+    return _pipeline(model=model, tokenizer=tokenizer)
+
+
+LOADERS: Dict[str, Callable[[str], Any]] = {
+    "torch": load_torch,
+    "torch-int8": load_torch_int8,
+    "onnx": load_onnx,
+}
+
+
+def load_engine(engine: str, model_name: str):
+    try:
+        loader = LOADERS[engine]
+    except KeyError:
+        raise ValueError(f"Unknown HF_ENGINE {engine!r}; expected one of {', '.join(ENGINES)}")
+    return loader(model_name)
+
+
+def parity_check(texts: List[str], engine: str, model_name: str, reference: str = "torch") -> Dict[str, Any]:
+    """Compare labels of `engine` against `reference` on the same texts."""
+    from .sentiment_hf import _run_pipeline
+
+    report: Dict[str, Any] = {"engine": engine, "reference": reference, "n": len(texts)}
+    labels = {}
+    for name in (reference, engine):
+        pipe = load_engine(name, model_name)
+        _run_pipeline(pipe, texts[:8])  # warm-up, excluded from timing
+        t0 = time.perf_counter()
+        labels[name] = [p["label"] for p in _run_pipeline(pipe, texts)]
+        report[f"{name}_seconds"] = round(time.perf_counter() - t0, 4)
+    mismatches = [i for i, (a, b) in enumerate(zip(labels[reference], labels[engine])) if a != b]
+    report["agreement"] = round(1 - len(mismatches) / len(texts), 4) if texts else 1.0
+    report["mismatches"] = [{"text": texts[i][:120], reference: labels[reference][i], engine: labels[engine][i]}
+                            for i in mismatches[:20]]
+    return report
+
+
+def _main() -> None:
+    from .sentiment_hf import _model_name
+
+    parser = argparse.ArgumentParser(description="Label parity of an inference engine against fp32 PyTorch")
+    parser.add_argument("--engine", choices=ENGINES, default=settings.HF_ENGINE)
+    parser.add_argument("--reviews", help="JSON list of reviews (defaults to every file in DATA_DIR/reviews)")
+    args = parser.parse_args()
+
+    paths = [Path(args.reviews)] if args.reviews else sorted((Path(settings.DATA_DIR) / "reviews").glob("*.json"))
+    texts = [r.get("text", "")[:500] for p in paths for r in json.loads(p.read_text(encoding="utf-8"))]
+    print(json.dumps(parity_check(texts, args.engine, _model_name()), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,34 @@
+from __future__ import annotations
+import asyncio
+import weakref
+
+import httpx
+
+from .config import settings
+
+# One pooled client per event loop: httpx connections are bound to the loop
+# that opened them, and tests or workers may run several loops over time.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared keep-alive AsyncClient for outbound API calls on the running loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=settings.HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose() -> None:
+    """Close the client of the running loop (app shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
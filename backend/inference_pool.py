@@ -0,0 +1,71 @@
+from __future__ import annotations
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from .config import settings
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(threads: int) -> None:
+    # Runs once per worker process: pin torch threads and load the model
+    from . import sentiment_hf
+    if threads > 0:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except Exception:
+            pass
+    sentiment_hf._get_pipeline()
+
+
+def _score_shard(texts: List[str]) -> List[Dict[str, Any]]:
+    from . import sentiment_hf
+    pipe = sentiment_hf._get_pipeline()
+    if pipe is None:
+        # Raise rather than score with the lexicon: the parent would tag those
+        # results with the model's engine and cache them. It falls back itself.
+        raise RuntimeError("sentiment model failed to load in the pool worker")
+    return sentiment_hf._run_pipeline(pipe, texts)
+
+
+def enabled_for(n_texts: int) -> bool:
+    """Small jobs stay in-process; the pool only pays off for large ones."""
+    return settings.HF_POOL_WORKERS > 0 and n_texts >= settings.HF_POOL_MIN_TEXTS
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: forking after torch has started its thread pools can deadlock
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.HF_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(settings.HF_POOL_THREADS_PER_WORKER,),
+            )
+        return _pool
+
+
+def run_sharded(texts: List[str]) -> List[Dict[str, Any]]:
+    """Score texts across the worker pool; results come back in input order."""
+    size = max(1, settings.HF_POOL_SHARD_SIZE)
+    shards = [texts[i:i + size] for i in range(0, len(texts), size)]
+    out: List[Dict[str, Any]] = []
+    for part in get_pool().map(_score_shard, shards):
+        out.extend(part)
+    return out
+
+
+@atexit.register
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
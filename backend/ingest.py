@@ -0,0 +1,128 @@
+from __future__ import annotations
+import csv
+import io
+import json
+from typing import Any, BinaryIO, Dict, Iterator
+
+CHUNK_SIZE = 64 * 1024
+_WS = " \t\r\n"
+
+
+def _review(r: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(r, dict):
+        raise ValueError("JSON must be a list of review objects")
+    return {"text": r.get("text", ""), "source": r.get("source"), "timestamp": r.get("timestamp")}
+
+
+def _iter_csv(text: io.TextIOBase) -> Iterator[Dict[str, Any]]:
+    for row in csv.DictReader(text):
+        yield _review(row)
+
+
+def _iter_json_lines(text: io.TextIOBase) -> Iterator[Dict[str, Any]]:
+    for n, line in enumerate(text, start=1):
+        if line.strip():
+            try:
+                yield _review(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"line {n}: {e}")
+
+
+def iter_json_array(text: io.TextIOBase) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array without loading the whole document."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        chunk = text.read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+            return False
+        buf, pos = buf[pos:] + chunk, 0
+        return True
+
+    def skip_ws() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return ""
+
+    if skip_ws() != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    if skip_ws() == "]":
+        return
+    while True:
+        skip_ws()
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # element continues past the buffer; read more unless the file is done
+            if eof or not fill():
+                raise
+            continue
+        # a number may be cut off at the buffer end; make sure a delimiter follows
+        if end == len(buf) and not eof and fill():
+            continue
+        pos = end
+        yield item
+        sep = skip_ws()
+        pos += 1
+        if sep == "]":
+            return
+        if sep != ",":
+            raise ValueError("Malformed JSON array")
+
+
+def iter_upload_rows(fileobj: BinaryIO, filename: str | None) -> Iterator[Dict[str, Any]]:
+    """Stream review rows out of an uploaded CSV, JSON array or JSON Lines file.
+
+    The file is decoded and parsed incrementally, so memory stays flat no
+    matter how large the upload is. Rows without text are skipped.
+    """
+    name = (filename or "").lower()
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", errors="ignore", newline="")
+    try:
+        if name.endswith(".csv"):
+            rows = _iter_csv(text)
+        elif name.endswith((".jsonl", ".ndjson")):
+            rows = _iter_json_lines(text)
+        else:
+            head = text.read(1)
+            while head and head in _WS:
+                head = text.read(1)
+            rest = _Prefixed(head, text)
+            rows = _iter_json_lines(rest) if head == "{" else map(_review, iter_json_array(rest))
+        for r in rows:
+            if r.get("text"):
+                yield r
+    finally:
+        # leave the underlying upload file open for its owner
+        text.detach()
+
+
+class _Prefixed(io.TextIOBase):
+    """Text stream that replays already-consumed characters before the rest."""
+
+    def __init__(self, prefix: str, stream: io.TextIOBase):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size: int = -1) -> str:
+        head, self._prefix = self._prefix, ""
+        if size is None or size < 0:
+            return head + self._stream.read()
+        return head + self._stream.read(max(0, size - len(head)))
+
+    def readline(self, size: int = -1) -> str:
+        head, self._prefix = self._prefix, ""
+        if "\n" in head:
+            line, _, rest = head.partition("\n")
+            self._prefix = rest
+            return line + "\n"
+        return head + self._stream.readline()
@@ -0,0 +1,221 @@
+from __future__ import annotations
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from .config import settings
+from .analysis import analyze_reviews
+from .persistence_json import (
+    load_reviews, load_analysis, update_analysis,
+    save_artifact, load_artifact, delete_artifact, list_artifacts,
+)
+from .serve import RESUME_ENV, WORKER_ENV
+
+# Job state is stored as a "jobs" artifact (DATA_DIR/jobs/{job_id}.json or the
+# SQLite artifacts table), so status survives a restart and unfinished jobs
+# can be picked up again by resume_pending(). Finished jobs beyond the last
+# _KEEP_FINISHED are dropped, artifacts included.
+KIND = "jobs"
+ACTIVE = ("queued", "running")
+_POLL_SECONDS = 0.25
+_KEEP_FINISHED = 100
+
+
+class Job:
+    """In-process handle of a job: its state plus the event log SSE clients replay.
+
+    Once the job finishes, the log is cut down to its final progress event:
+    scored rows are in the saved analysis by then, and a finished job held
+    for status queries should not also hold every chunk it streamed.
+    """
+
+    def __init__(self, state: Dict[str, Any]):
+        self.state = state
+        # consecutive sequence numbers, starting at self.events[0][0]
+        self.events: List[Tuple[int, str, Any]] = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @property
+    def job_id(self) -> str:
+        return self.state["job_id"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.state)
+
+    def finished(self) -> bool:
+        with self._lock:
+            return self.state["status"] not in ACTIVE
+
+    def _append(self, event: str, data: Any) -> None:
+        # caller holds _lock
+        self._seq += 1
+        self.events.append((self._seq, event, data))
+
+    def emit(self, event: str, data: Any) -> None:
+        with self._lock:
+            self._append(event, data)
+
+    def update(self, **changes: Any) -> None:
+        with self._lock:
+            self.state.update(changes, updated_at=time.time())
+            state = dict(self.state)
+            if state["status"] not in ACTIVE:
+                self.events.clear()
+            self._append("progress", state)
+        save_artifact(KIND, self.job_id, state)
+
+    def events_after(self, seq: int) -> List[Tuple[int, str, Any]]:
+        """Events numbered after `seq`; after compaction, at least the final one."""
+        with self._lock:
+            if not self.events:
+                return []
+            return self.events[max(0, seq - self.events[0][0] + 1):]
+
+
+_jobs: Dict[str, Job] = {}
+_jobs_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Dedicated threads: long inference runs never occupy FastAPI's threadpool
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(1, settings.JOBS_MAX_WORKERS), thread_name_prefix="analysis-job")
+    return _executor
+
+
+def _run(job: Job) -> None:
+    imdb_id = job.state["imdb_id"]
+    job.update(status="running")
+    try:
+        reviews = load_reviews(imdb_id)
+        if not reviews:
+            raise LookupError("No reviews uploaded/imported for this movie")
+        previous = None if job.state["full"] else load_analysis(imdb_id)
+        job.update(total=len(reviews))
+
+        def on_chunk(rows: List[Dict[str, Any]], scored: int, to_score: int) -> None:
+            job.emit("rows", rows)
+            job.update(scored=scored, to_score=to_score)
+
+        rows, stats = analyze_reviews(reviews, previous, chunk_size=settings.JOBS_CHUNK_SIZE, on_chunk=on_chunk)
+        update_analysis(imdb_id, rows, job.state["full"])
+        job.update(status="done", count=len(rows), **stats)
+    except Exception as e:
+        job.update(status="failed", error=str(e))
+
+
+def _register(job: Job) -> List[str]:
+    """Track `job`, evicting the oldest finished jobs past _KEEP_FINISHED.
+    Returns the evicted ids, whose artifacts the caller deletes after
+    releasing _jobs_lock (which it holds)."""
+    _jobs[job.job_id] = job
+    finished = [j for j in _jobs.values() if j is not job and j.finished()]
+    evicted = [old.job_id for old in finished[:max(0, len(finished) - _KEEP_FINISHED)]]
+    for job_id in evicted:
+        del _jobs[job_id]
+    return evicted
+
+
+def _delete(job_ids: List[str]) -> None:
+    for job_id in job_ids:
+        delete_artifact(KIND, job_id)
+
+
+def submit(imdb_id: str, full: bool = False) -> Dict[str, Any]:
+    """Queue an analysis of `imdb_id`; an active job for it with the same `full` is
+    reused. One with another `full` runs alongside it; update_analysis keeps
+    their writes from overlapping."""
+    with _jobs_lock:
+        for job in _jobs.values():
+            if job.state["imdb_id"] == imdb_id and job.state["full"] == full and not job.finished():
+                return job.snapshot()
+        now = time.time()
+        job = Job({
+            "job_id": uuid.uuid4().hex,
+            "imdb_id": imdb_id,
+            "full": full,
+            "status": "queued",
+            "total": None,
+            "to_score": None,
+            "scored": 0,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+        evicted = _register(job)
+    _delete(evicted)
+    save_artifact(KIND, job.job_id, job.state)
+    _get_executor().submit(_run, job)
+    return job.snapshot()
+
+
+def get(job_id: str) -> Dict[str, Any] | None:
+    job = _jobs.get(job_id)
+    return job.snapshot() if job else load_artifact(KIND, job_id)
+
+
+def resume_pending() -> int:
+    """Re-queue jobs left queued or running by a previous process.
+
+    Under the pre-fork server (backend.serve) only worker 0 of the first start
+    does this: a job is not picked up once per worker, and a restarted worker
+    does not re-queue jobs its siblings are still running.
+    """
+    if WORKER_ENV in os.environ and os.environ.get(RESUME_ENV) != "1":
+        return 0
+    resumed = 0
+    finished: List[Tuple[float, str]] = []
+    for job_id in list_artifacts(KIND):
+        state = load_artifact(KIND, job_id)
+        if not state or job_id in _jobs:
+            continue
+        if state.get("status") not in ACTIVE:
+            finished.append((state.get("updated_at") or 0, job_id))
+            continue
+        state.update(status="queued", scored=0, resumed=True)
+        job = Job(state)
+        with _jobs_lock:
+            evicted = _register(job)
+        _delete(evicted)
+        # rows scored before the restart come back from the prediction cache
+        _get_executor().submit(_run, job)
+        resumed += 1
+    # finished jobs of earlier processes: keep the most recent _KEEP_FINISHED
+    finished.sort()
+    _delete([job_id for _, job_id in finished[:max(0, len(finished) - _KEEP_FINISHED)]])
+    return resumed
+
+
+def _sse(seq: int, event: str, data: Any) -> str:
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def events(job_id: str, last_event_id: int = 0) -> AsyncIterator[str]:
+    """Server-Sent Events for a job: `progress` with the job state and `rows`
+    with each newly scored chunk, ending once the job has finished.
+
+    Jobs not running in this process only report their stored state.
+    """
+    job = _jobs.get(job_id)
+    if job is None:
+        state = load_artifact(KIND, job_id)
+        if state:
+            yield _sse(1, "progress", state)
+        return
+    seq = last_event_id
+    while True:
+        done = job.finished()
+        for seq, event, data in job.events_after(seq):
+            yield _sse(seq, event, data)
+        if done:
+            return
+        await asyncio.sleep(_POLL_SECONDS)
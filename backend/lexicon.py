@@ -0,0 +1,207 @@
+from __future__ import annotations
+import json
+import threading
+from itertools import compress, count, repeat
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .config import settings
+
+# Built-in lexicon. Matching is on whole words; a trailing "*" matches any
+# word starting with the stem ("love*" -> love, loved, lovely), and entries
+# may be multi-word phrases ("waste of time", "not bad", "love* it"). A
+# matched phrase scores in place of its words, longest phrase first.
+# Positive weights push towards POSITIVE, negative weights towards NEGATIVE.
+DEFAULT_LEXICON: Dict[str, float] = {
+    "good": 1.0, "great": 1.0, "love*": 1.0, "amazing": 1.0, "stunning": 1.0,
+    "awesome": 1.0, "breathtaking": 1.0, "fantastic": 1.0, "enjoy*": 1.0,
+    "bad": -1.0, "boring": -1.0, "slow": -1.0, "terrible": -1.0, "awful": -1.0,
+    "overhyped": -1.0, "hate*": -1.0, "dull": -1.0, "disappointing": -1.0,
+}
+
+NEGATORS = frozenset({"not", "no", "never", "hardly", "without", "nothing", "neither", "nor"})
+# A negator flips lexicon terms up to this many tokens after it, within the same clause
+NEGATION_WINDOW = 3
+_NEG, _END, _UNSEEN = object(), object(), object()
+_STRIP = "'\"“”‘’«»…—–"
+# Compiled once: ASCII punctuation becomes whitespace, clause punctuation a
+# NUL separator and ASCII letters lowercase, so tokenizing is bytes.translate
+# + split (both in C)
+_TABLE = bytearray(range(256))
+for _c in b"\"#$%&()*+-/<=>@[\\]^_`{|}~":
+    _TABLE[_c] = ord(" ")
+for _c in b".!?;:,":
+    _TABLE[_c] = 0
+for _c in range(ord("A"), ord("Z") + 1):
+    _TABLE[_c] = _c + 32
+_TABLE = bytes(_TABLE)
+_MAX_VOCAB = 200_000
+# Texts are joined with a \x01 separator and scanned in chunks of this many
+_DOC = "\x01"
+_CHUNK = 2048
+
+
+def _normalize(token: bytes) -> str:
+    return token.decode("utf-8", errors="ignore").replace("’", "'").strip(_STRIP)
+
+
+class Lexicon:
+    """Weighted lexicon scorer over whole tokens.
+
+    Texts are split into clauses and tokens with one translate/split pass;
+    each distinct token is classified once (term weight, negator or noise) and
+    memoized, so scoring a batch costs about one set lookup per token.
+    """
+
+    def __init__(self, weights: Dict[str, float], negation_window: int = NEGATION_WINDOW):
+        self.weights = {" ".join(k.lower().split()): float(v) for k, v in weights.items()}
+        self.negation_window = negation_window
+        self._exact: Dict[str, float] = {}
+        self._stems: List[tuple] = []
+        # multi-word entries, keyed by their first word, or by its stem when
+        # that is a wildcard: (remaining words, weight)
+        self._phrases: Dict[str, List[tuple]] = {}
+        self._stem_phrases: Dict[str, List[tuple]] = {}
+        for term, w in self.weights.items():
+            words = term.split()
+            if len(words) > 1:
+                first = words[0]
+                if first.endswith("*"):
+                    self._stem_phrases.setdefault(first[:-1], []).append((words[1:], w))
+                else:
+                    self._phrases.setdefault(first, []).append((words[1:], w))
+            elif term.endswith("*"):
+                self._stems.append((term[:-1], w))
+            else:
+                self._exact[term] = w
+        # longest stems first so "enjoyable*" wins over "enjoy*"
+        self._stems.sort(key=lambda kv: -len(kv[0]))
+        self._reset_vocab()
+
+    def _reset_vocab(self) -> None:
+        # token -> weight | _NEG | _END, a (weight | _NEG | None, phrases) tuple
+        # for tokens that start phrases, or False for noise (clause separators too)
+        self._vocab: Dict[bytes, Any] = {b"\1": _END, b"\0": False}
+
+    @classmethod
+    def from_file(cls, path: Path) -> "Lexicon":
+        return cls(json.loads(path.read_text(encoding="utf-8")))
+
+    @staticmethod
+    def _word_matches(pattern: str, word: str) -> bool:
+        return word.startswith(pattern[:-1]) if pattern.endswith("*") else word == pattern
+
+    def _classify(self, token: bytes) -> Any:
+        word = _normalize(token)
+        kind: Any = None
+        if word in NEGATORS or word.endswith("n't"):
+            kind = _NEG
+        elif word in self._exact:
+            kind = self._exact[word]
+        else:
+            for stem, w in self._stems:
+                if word.startswith(stem):
+                    kind = w
+                    break
+        phrases = list(self._phrases.get(word, ()))
+        for stem, entries in self._stem_phrases.items():
+            if word.startswith(stem):
+                phrases += entries
+        if phrases:
+            return kind, tuple(sorted(phrases, key=lambda p: -len(p[0])))
+        return kind
+
+    def score_many(self, texts: List[str]) -> List[float]:
+        """Raw lexicon score per text, computed in one scan over the whole batch."""
+        totals = [0.0] * len(texts)
+        for start in range(0, len(texts), _CHUNK):
+            chunk = texts[start:start + _CHUNK]
+            # ASCII letters are lowercased by the translate table; only texts
+            # with other characters need str.lower()
+            data = _DOC.join([t if t.isascii() else t.lower() for t in chunk]).encode("utf-8").translate(_TABLE)
+            if data.count(b"\1") != len(chunk) - 1:
+                # a text contained the separator byte itself; score one by one
+                for j, t in enumerate(chunk):
+                    self._scan(t.replace(_DOC, " ").lower().encode("utf-8").translate(_TABLE), totals, start + j)
+            else:
+                self._scan(data, totals, start)
+        return totals
+
+    def _scan(self, data: bytes, totals: List[float], doc: int) -> None:
+        tokens = data.replace(b"\0", b" \0 ").replace(b"\1", b" \1 ").split()
+        if len(self._vocab) > _MAX_VOCAB:
+            self._reset_vocab()
+        vocab = self._vocab
+        # one dict lookup per token, in C. Only tokens with an entry (terms,
+        # negators, phrase starts, text separators) reach Python code, plus
+        # tokens not seen before, which are classified there once.
+        kinds = list(map(vocab.get, tokens, repeat(_UNSEEN)))
+        window = self.negation_window
+        neg_at = -window - 1
+        total = 0.0
+        skip = 0
+        for i in compress(count(), kinds):
+            if i < skip:
+                continue
+            w = kinds[i]
+            if w is _UNSEEN:
+                w = vocab.get(tokens[i], _UNSEEN)
+                if w is _UNSEEN:
+                    w = vocab[tokens[i]] = self._classify(tokens[i]) or False
+                if w is False:
+                    continue
+            if w is _END:
+                totals[doc] = total
+                doc, total, neg_at = doc + 1, 0.0, -window - 1
+                continue
+            if w.__class__ is tuple:
+                w, phrases = w
+                for rest, pw in phrases:
+                    following = [_normalize(t) for t in tokens[i + 1:i + 1 + len(rest)]]
+                    if len(following) == len(rest) and all(map(self._word_matches, rest, following)):
+                        w, skip = pw, i + 1 + len(rest)
+                        break
+            if w is _NEG:
+                neg_at = i
+            elif w is not None:
+                # negation reaches `window` tokens ahead, but not past a clause break
+                if i - neg_at <= window and b"\0" not in tokens[neg_at + 1:i]:
+                    w = -w
+                total += w
+        totals[doc] = total
+
+    def score_text(self, text: str) -> float:
+        return self.score_many([text])[0]
+
+    def score_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        out = []
+        for s in self.score_many(texts):
+            if s > 0:
+                out.append({"label": "POSITIVE", "score": 0.85})
+            elif s < 0:
+                out.append({"label": "NEGATIVE", "score": 0.85})
+            else:
+                out.append({"label": "NEUTRAL", "score": 0.60})
+        return out
+
+
+_lexicon: Lexicon | None = None
+_lexicon_lock = threading.Lock()
+
+
+def lexicon_path() -> Path:
+    return Path(settings.LEXICON_PATH) if settings.LEXICON_PATH else Path(settings.DATA_DIR) / "lexicon.json"
+
+
+def get_lexicon() -> Lexicon:
+    """Lexicon from LEXICON_PATH (default DATA_DIR/lexicon.json), else the built-in one."""
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            path = lexicon_path()
+            _lexicon = Lexicon.from_file(path) if path.exists() else Lexicon(DEFAULT_LEXICON)
+        return _lexicon
+
+
+def score_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    return get_lexicon().score_batch(texts)
@@ -0,0 +1,28 @@
+from __future__ import annotations
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: threads are still serialized, processes are not
+    fcntl = None
+
+_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def path_lock(path: Path) -> Iterator[None]:
+    """Exclusive lock named by `path`, held across threads and, through an
+    flock on `path` itself, across processes (e.g. backend.serve workers)."""
+    with _locks_guard:
+        lock = _locks[str(path)]
+    with lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield  # the flock goes with the file descriptor
@@ -0,0 +1,196 @@
+from __future__ import annotations
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+# Minimal in-process metrics rendered in the Prometheus text format
+# (version 0.0.4), so /api/metrics needs no extra dependency. Updates are a
+# dict lookup plus a couple of additions under a lock.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_num(value)}"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket (non-cumulative) counts + overflow slot, sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels: Any) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        counts, total, n = value
+        out, cumulative = [], 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            cumulative += c
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{_num(bound)}"'
+            out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}")
+        out.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return out
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# -------- application metrics --------
+STAGE_SECONDS = Histogram("msa_stage_seconds", "Time spent per pipeline stage.", ("stage",))
+HTTP_SECONDS = Histogram("msa_http_request_seconds", "Request latency per route.",
+                         ("method", "route", "status"))
+BATCH_SIZE = Histogram("msa_inference_batch_size", "Texts per model forward pass.", buckets=SIZE_BUCKETS)
+PREDICTED_TEXTS = Counter("msa_predicted_texts_total", "Texts scored, by engine (lexicon = fallback).", ("engine",))
+TEXTS_PER_SECOND = Gauge("msa_inference_texts_per_second", "Throughput of the most recent model call.", ("engine",))
+CACHE_LOOKUPS = Counter("msa_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+FALLBACKS = Counter("msa_fallback_activations_total", "predict() calls answered by the lexicon scorer.", ("reason",))
+PREDICT_ERRORS = Counter("msa_predict_errors_total", "Model errors predict() recovered from via the fallback.",
+                         ("exception",))
+QUEUE_DEPTH = Gauge("msa_inference_queue_depth", "/api/analyze-text requests waiting for or in the model.")
+DEGRADED = Counter("msa_degraded_requests_total", "Requests routed to the lexicon scorer under load.", ("reason",))
+UPSTREAM_SECONDS = Histogram("msa_upstream_request_seconds", "Latency of OMDb/TMDb calls.", ("service", "outcome"))
+
+
+def timed(stage: str) -> Callable:
+    """Decorator recording a function's run time under msa_stage_seconds{stage}."""
+    def decorate(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - t0, stage=stage)
+        return wrapper
+    return decorate
+
+
+class LatencyMiddleware:
+    """ASGI middleware observing msa_http_request_seconds per matched route.
+
+    Labels use the route template (/api/summary/{imdb_id}), not the raw path,
+    so the series count stays bounded; the time covers the whole response,
+    including streamed bodies.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        t0 = time.perf_counter()
+        status = [500]
+
+        async def send_status(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            # the router stores the matched route in the shared scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.observe(time.perf_counter() - t0, method=scope["method"], route=route, status=status[0])
@@ -0,0 +1,54 @@
+from __future__ import annotations
+import datetime
+import random
+from typing import Any, Dict, List
+
+# Templates behind /api/reviews/{imdb_id}/generate, also used to build
+# benchmark corpora (benchmarks/bench_suite.py)
+POS_TEMPLATES = [
+    "Amazing movie with stunning visuals!",
+    "Great acting and beautiful score.",
+    "Loved it, a must watch.",
+    "Fantastic world-building and direction.",
+    "I enjoyed every minute!"
+]
+NEG_TEMPLATES = [
+    "Boring and too slow.",
+    "I hate the pacing, overhyped.",
+    "Terrible writing and confusing plot.",
+    "Awful experience, not worth it.",
+    "Disappointing and dull."
+]
+NEU_TEMPLATES = [
+    "It was okay, nothing special.",
+    "Fine movie with some good moments.",
+    "Average overall.",
+    "Mixed feelings about it.",
+    "Neutral on this one."
+]
+
+
+def generate(count: int, rng: random.Random | None = None, unique: bool = False, spread_days: int = 0) -> List[Dict[str, Any]]:
+    """Mock reviews: 40% positive, 30% negative, the rest neutral templates.
+
+    `unique` strings one to three same-mood templates together and numbers
+    them, so no two texts repeat (caches and dedup cannot shortcut a
+    benchmark). `spread_days` backdates timestamps randomly over that many
+    days instead of stamping them all with the current time.
+    """
+    rng = rng or random.Random()
+    n_pos = max(1, int(count * 0.4))
+    n_neg = max(1, int(count * 0.3))
+    n_neu = max(1, count - n_pos - n_neg)
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+
+    rows: List[Dict[str, Any]] = []
+    for templates, n in ((POS_TEMPLATES, n_pos), (NEG_TEMPLATES, n_neg), (NEU_TEMPLATES, n_neu)):
+        for _ in range(n):
+            if unique:
+                text = " ".join(rng.choice(templates) for _ in range(rng.randint(1, 3))) + f" (#{len(rows) + 1})"
+            else:
+                text = rng.choice(templates)
+            ts = now - datetime.timedelta(seconds=rng.randrange(spread_days * 86400)) if spread_days else now
+            rows.append({"text": text, "source": "mock", "timestamp": ts.isoformat() + "Z"})
+    return rows
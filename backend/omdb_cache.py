@@ -0,0 +1,177 @@
+from __future__ import annotations
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from .config import settings
+from . import metrics, omdb_client
+from .persistence_json import load_movie_meta, save_movie_meta
+
+
+class _Entry:
+    __slots__ = ("value", "expires", "stale_until")
+
+    def __init__(self, value: Any, expires: float, stale_until: float):
+        self.value = value
+        self.expires = expires
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    """Bounded LRU cache with per-entry TTLs and stale-while-revalidate.
+
+    A fresh entry is returned as is. An expired entry is still returned while
+    it is within `stale_ttl` of expiring, and a background task refreshes it;
+    if that refresh fails the stale value simply keeps being served, and the
+    key is not refreshed again for `refresh_backoff` seconds, doubling with
+    each further failure up to `refresh_backoff_max`, so an outage upstream
+    does not turn every stale hit into a request. Fetches run once per key
+    no matter how many callers are waiting.
+    """
+
+    def __init__(self, max_entries: int, stale_ttl: float, clock: Callable[[], float] = time.monotonic,
+                 name: str = "ttl", refresh_backoff: float = 0.0, refresh_backoff_max: float = 0.0):
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self.refresh_backoff = refresh_backoff
+        self.refresh_backoff_max = max(refresh_backoff, refresh_backoff_max)
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # key -> (consecutive failed fetches, no background refresh before this time)
+        self._failures: Dict[Hashable, Tuple[int, float]] = {}
+        self.hits = self.stale_hits = self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def put(self, key: Hashable, value: Any, ttl: float) -> None:
+        expires = self.clock() + ttl
+        self._data[key] = _Entry(value, expires, expires + self.stale_ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._failures.pop(self._data.popitem(last=False)[0], None)
+
+    def seed_stale(self, key: Hashable, value: Any) -> None:
+        """Insert an already-expired value, e.g. one recovered from disk."""
+        self.put(key, value, 0.0)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._inflight.clear()
+        self._failures.clear()
+        self.hits = self.stale_hits = self.misses = 0
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: Callable[[Any], float]) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+            now = self.clock()
+            if now < entry.expires:
+                self.hits += 1
+                metrics.CACHE_LOOKUPS.inc(cache=self.name, result="hit")
+                return entry.value
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                metrics.CACHE_LOOKUPS.inc(cache=self.name, result="stale")
+                failure = self._failures.get(key)
+                if failure is None or now >= failure[1]:
+                    self._refresh(key, fetch, ttl)
+                return entry.value
+        self.misses += 1
+        metrics.CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+        # shielded: a cancelled request must not cancel a fetch others await
+        return await asyncio.shield(self._refresh(key, fetch, ttl))
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: Callable[[Any], float]) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return task
+
+        async def load() -> Any:
+            value = await fetch()
+            self.put(key, value, ttl(value))
+            return value
+
+        task = loop.create_task(load())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return task
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        # background refresh failures are expected; retrieving marks them handled
+        if task.exception() is None:
+            self._failures.pop(key, None)
+        elif key in self._data and self.refresh_backoff > 0:
+            count = self._failures.get(key, (0, 0.0))[0] + 1
+            delay = min(self.refresh_backoff * 2 ** (count - 1), self.refresh_backoff_max)
+            self._failures[key] = (count, self.clock() + delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+
+_cache: TTLCache | None = None
+
+
+def get_cache() -> TTLCache:
+    global _cache
+    if _cache is None:
+        _cache = TTLCache(settings.OMDB_CACHE_SIZE, settings.OMDB_CACHE_STALE_TTL, name="omdb",
+                          refresh_backoff=settings.OMDB_CACHE_REFRESH_BACKOFF,
+                          refresh_backoff_max=settings.OMDB_CACHE_REFRESH_BACKOFF_MAX)
+    return _cache
+
+
+def _ttl(fresh_ttl: float) -> Callable[[Dict[str, Any]], float]:
+    # OMDb reports misses as {"Response": "False", "Error": ...}; keep those briefly
+    def ttl(data: Dict[str, Any]) -> float:
+        return fresh_ttl if data.get("Response") == "True" else settings.OMDB_CACHE_NEGATIVE_TTL
+    return ttl
+
+
+async def search_movies(query: str) -> Dict[str, Any]:
+    """Cached omdb_client.search_movies, keyed on the normalized query."""
+    key = ("search", " ".join(query.lower().split()))
+    return await get_cache().get(key, lambda: omdb_client.search_movies(query),
+                                 _ttl(settings.OMDB_CACHE_SEARCH_TTL))
+
+
+async def get_movie_by_id(imdb_id: str) -> Dict[str, Any]:
+    """Cached omdb_client.get_movie_by_id.
+
+    On a cold cache the metadata saved under movies/ is served straight away
+    as a stale entry and revalidated in the background, so a slow or down
+    OMDb never blocks a movie we have seen before.
+    """
+    cache = get_cache()
+    key = ("movie", imdb_id)
+
+    async def fetch() -> Dict[str, Any]:
+        data = await omdb_client.get_movie_by_id(imdb_id)
+        if data.get("Response") == "True":
+            save_movie_meta(imdb_id, data)
+        return data
+
+    if key not in cache:
+        saved = load_movie_meta(imdb_id)
+        if saved:
+            cache.seed_stale(key, saved)
+    return await cache.get(key, fetch, _ttl(settings.OMDB_CACHE_MOVIE_TTL))
+
+
+def stats() -> Dict[str, Any]:
+    return get_cache().stats()
@@ -1,7 +1,10 @@
 from __future__ import annotations
-import requests
+import httpx
+import time
 from typing import Any, Dict
 from .config import settings
+from .http_client import get_client
+from . import metrics
 
 BASE_URL = "https://www.omdbapi.com"
 
@@ -13,14 +16,26 @@ def _require_key() -> str:
         raise OMDbUnavailable("OMDb API key missing or dummy; set OMDB_API_KEY in .env")
     return settings.OMDB_API_KEY
 
-def search_movies(query: str) -> Dict[str, Any]:
+async def _get(params: Dict[str, Any]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        resp = await get_client().get(BASE_URL, params=params)
+        resp.raise_for_status()
+        data = resp.json()
+        outcome = "ok"
+        return data
+    except httpx.HTTPError as e:
+        raise OMDbUnavailable(f"OMDb API error: {str(e)}")
+    except ValueError as e:
+        raise OMDbUnavailable(f"OMDb API returned unexpected data: {str(e)}")
+    finally:
+        metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - t0, service="omdb", outcome=outcome)
+
+async def search_movies(query: str) -> Dict[str, Any]:
     key = _require_key()
-    resp = requests.get(BASE_URL, params={"s": query, "apikey": key, "type": "movie"}, timeout=15)
-    resp.raise_for_status()
-    return resp.json()
+    return await _get({"s": query, "apikey": key, "type": "movie"})
 
-def get_movie_by_id(imdb_id: str) -> Dict[str, Any]:
+async def get_movie_by_id(imdb_id: str) -> Dict[str, Any]:
     key = _require_key()
-    resp = requests.get(BASE_URL, params={"i": imdb_id, "apikey": key, "plot": "short"}, timeout=15)
-    resp.raise_for_status()
-    return resp.json()
+    return await _get({"i": imdb_id, "apikey": key, "plot": "short"})
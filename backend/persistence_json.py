@@ -1,19 +1,169 @@
 from __future__ import annotations
 import json
+import os
+import shutil
+import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, List, Dict
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Tuple
 from .config import settings
+from . import columnar, metrics, persistence_sqlite
+from .metrics import timed
+from .ingest import iter_json_array
+from .analysis import appended_rows
+from .locks import path_lock
+from .summary import SummaryAggregate
+from .rollups import TrendRollup
+from .search_index import SearchIndex
 
 BASE = Path(settings.DATA_DIR)
 
+def _sqlite() -> bool:
+    # STORAGE_BACKEND=sqlite routes the save_*/load_* functions below to persistence_sqlite
+    return settings.STORAGE_BACKEND == "sqlite"
+
+class _ReadCache:
+    """Parsed file contents keyed by path, for back-to-back reads of one movie.
+
+    An entry is served only while the file's (inode, mtime, size) stamp is
+    unchanged, so writes from other processes are noticed too; writes made
+    here also drop the entry right away. Entries are evicted LRU once their
+    estimated in-memory sizes (_estimate_size) add up to more than max_bytes. Lists and dicts come back as
+    shallow copies: callers may add or drop items, but not edit the rows.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int, int], int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path, load: Callable[[], Any], stamp_path: Path | None = None) -> Any:
+        """`load()`'s result for `path`, re-run only when `stamp_path` (default `path`) changed."""
+        try:
+            st = os.stat(stamp_path or path)
+        except FileNotFoundError:
+            self.discard(path)
+            return None
+        return self.get_stamped(str(path), (st.st_ino, st.st_mtime_ns, st.st_size), load)
+
+    def get_stamped(self, key: str, stamp: Any, load: Callable[[], Any]) -> Any:
+        """`load()`'s result cached under `key`, re-run when `stamp` differs from the cached one."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.CACHE_LOOKUPS.inc(cache="reads", result="hit")
+                return _copy(entry[2])
+            self.misses += 1
+        metrics.CACHE_LOOKUPS.inc(cache="reads", result="miss")
+        value = load()
+        nbytes = _estimate_size(value)
+        with self._lock:
+            self._drop(key)
+            if nbytes <= self.max_bytes:
+                self._entries[key] = (stamp, nbytes, value)
+                self._bytes += nbytes
+                while self._bytes > self.max_bytes:
+                    self._drop(next(iter(self._entries)))
+        return _copy(value)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def discard(self, path: Path) -> None:
+        with self._lock:
+            self._drop(str(path))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+# Items per list/dict measured by _estimate_size; the rest are assumed alike
+_SIZE_SAMPLE = 32
+
+def _items_weight(item: Any) -> int:
+    return 1 + len(item) if isinstance(item, (list, dict)) else 1
+
+def _estimate_size(value: Any, seen: set | None = None) -> int:
+    """Approximate memory held by parsed JSON, in bytes.
+
+    Parsed data takes several times its file size (a row dict alone is
+    ~650 bytes), so the cache is charged this instead: sys.getsizeof of each
+    container plus its items, measured on an evenly spread sample and scaled
+    up by the items' lengths (posting lists range from one entry to every
+    row). Objects met again in the sample (dict keys, repeated labels) are
+    counted once.
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict) and value:
+        keys, items = list(value), list(value.values())
+    elif isinstance(value, list) and value:
+        keys, items = [], value
+    else:
+        return size
+    step = max(1, len(items) // _SIZE_SAMPLE)
+    sample = items[::step]
+    measured = sum(_estimate_size(v, seen) for v in sample) + sum(_estimate_size(k, seen) for k in keys[::step])
+    weight = sum(map(_items_weight, sample))
+    if weight > len(sample):
+        return size + measured * sum(map(_items_weight, items)) // weight
+    return size + measured * len(items) // len(sample)
+
+_cache = _ReadCache(settings.READ_CACHE_MAX_BYTES)
+
+def read_cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+def clear_read_cache() -> None:
+    _cache.clear()
+
 def _write_json(path: Path, data: Any) -> None:
+    # compact, and atomic: readers see the old file or the new one, never a torn write
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    tmp = path.with_name(f"{path.name}.tmp{os.getpid()}-{threading.get_ident()}")
+    try:
+        tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    _cache.discard(path)
 
 def _read_json(path: Path) -> Any:
-    if not path.exists():
-        return None
-    return json.loads(path.read_text(encoding="utf-8"))
+    return _cache.get(path, lambda: json.loads(path.read_text(encoding="utf-8")))
 
 def movie_path(imdb_id: str) -> Path:
     return BASE / "movies" / f"{imdb_id}.json"
@@ -24,20 +174,369 @@ def reviews_path(imdb_id: str) -> Path:
 def analysis_path(imdb_id: str) -> Path:
     return BASE / "analysis" / f"{imdb_id}_sentiment.json"
 
+def analysis_columns_path(imdb_id: str) -> Path:
+    return BASE / "analysis" / f"{imdb_id}_sentiment.cols"
+
+def _columnar() -> bool:
+    return settings.ANALYSIS_FORMAT == "columnar"
+
+def artifact_path(kind: str, imdb_id: str) -> Path:
+    return BASE / kind / f"{imdb_id}.json"
+
+def save_artifact(kind: str, imdb_id: str, data: Any) -> None:
+    """Derived per-movie data (summaries, indexes, ...) kept next to the analysis."""
+    if _sqlite():
+        return persistence_sqlite.save_artifact(kind, imdb_id, data)
+    _write_json(artifact_path(kind, imdb_id), data)
+
+def load_artifact(kind: str, imdb_id: str) -> Any:
+    if _sqlite():
+        return persistence_sqlite.load_artifact(kind, imdb_id)
+    return _read_json(artifact_path(kind, imdb_id))
+
+def delete_artifact(kind: str, imdb_id: str) -> None:
+    if _sqlite():
+        return persistence_sqlite.delete_artifact(kind, imdb_id)
+    artifact_path(kind, imdb_id).unlink(missing_ok=True)
+
+def list_artifacts(kind: str) -> List[str]:
+    """Ids that have an artifact of this kind."""
+    if _sqlite():
+        return persistence_sqlite.list_artifacts(kind)
+    return sorted(p.stem for p in (BASE / kind).glob("*.json"))
+
+def artifact_log_path(kind: str, imdb_id: str) -> Path:
+    return BASE / kind / f"{imdb_id}.jsonl"
+
+def append_artifact_log(kind: str, imdb_id: str, record: Any) -> None:
+    """Add one record to a per-movie append-only log; writes only the record."""
+    if _sqlite():
+        return persistence_sqlite.append_artifact_log(kind, imdb_id, record)
+    path = artifact_log_path(kind, imdb_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    _cache.discard(path)
+
+def _parse_log(path: Path) -> List[Any]:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                pass  # torn write
+    return records
+
+def load_artifact_log(kind: str, imdb_id: str) -> List[Any]:
+    if _sqlite():
+        return persistence_sqlite.load_artifact_log(kind, imdb_id)
+    path = artifact_log_path(kind, imdb_id)
+    return _cache.get(path, lambda: _parse_log(path)) or []
+
+def delete_artifact_log(kind: str, imdb_id: str) -> None:
+    if _sqlite():
+        return persistence_sqlite.delete_artifact_log(kind, imdb_id)
+    artifact_log_path(kind, imdb_id).unlink(missing_ok=True)
+    _cache.discard(artifact_log_path(kind, imdb_id))
+
+def dedup_index_path(imdb_id: str) -> Path:
+    return BASE / "dedup" / f"{imdb_id}.sqlite3"
+
+def dedup_lock(imdb_id: str):
+    """Held while a movie's ingest dedup index is used, replaced or dropped."""
+    return path_lock(BASE / "cache" / "locks" / f"{imdb_id}.dedup.lock")
+
+def _drop_dedup_index(imdb_id: str) -> None:
+    # replacing the reviews outdates the ingest dedup index; it is rebuilt on demand
+    with dedup_lock(imdb_id):
+        dedup_index_path(imdb_id).unlink(missing_ok=True)
+
 def save_movie_meta(imdb_id: str, meta: Dict[str, Any]) -> None:
+    if _sqlite():
+        return persistence_sqlite.save_movie_meta(imdb_id, meta)
     _write_json(movie_path(imdb_id), meta)
 
 def load_movie_meta(imdb_id: str) -> Dict[str, Any] | None:
+    if _sqlite():
+        return persistence_sqlite.load_movie_meta(imdb_id)
     return _read_json(movie_path(imdb_id))
 
+@timed("save_reviews")
 def save_reviews(imdb_id: str, reviews: List[Dict[str, Any]]) -> None:
+    _drop_dedup_index(imdb_id)
+    if _sqlite():
+        return persistence_sqlite.save_reviews(imdb_id, reviews)
     _write_json(reviews_path(imdb_id), reviews)
 
+@timed("save_reviews_stream")
+def save_reviews_stream(imdb_id: str, reviews: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+    """Replace a movie's reviews from an iterator, writing in batches.
+
+    Nothing is replaced if the iterator raises or yields no rows. Returns the
+    number of reviews written.
+    """
+    if _sqlite():
+        count = persistence_sqlite.save_reviews_stream(imdb_id, reviews, batch_size)
+        if count:
+            _drop_dedup_index(imdb_id)
+        return count
+    path = reviews_path(imdb_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".part")
+    count = 0
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write("[")
+            batch: List[str] = []
+            for r in reviews:
+                batch.append(json.dumps(r, ensure_ascii=False))
+                if len(batch) >= batch_size:
+                    f.write(("," if count else "") + ",".join(batch))
+                    count += len(batch)
+                    batch = []
+            if batch:
+                f.write(("," if count else "") + ",".join(batch))
+                count += len(batch)
+            f.write("]")
+        if count:
+            os.replace(tmp, path)
+            _cache.discard(path)
+            _drop_dedup_index(imdb_id)
+        return count
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+@timed("append_reviews")
+def append_reviews(imdb_id: str, reviews: List[Dict[str, Any]]) -> int:
+    """Add reviews after the existing ones; returns the new total."""
+    if _sqlite():
+        return persistence_sqlite.append_reviews(imdb_id, reviews)
+    existing = load_reviews(imdb_id) or []
+    merged = existing + list(reviews)
+    _write_json(reviews_path(imdb_id), merged)
+    return len(merged)
+
+@timed("load_reviews")
 def load_reviews(imdb_id: str) -> List[Dict[str, Any]] | None:
+    if _sqlite():
+        return persistence_sqlite.load_reviews(imdb_id)
     return _read_json(reviews_path(imdb_id))
 
+def _analysis_lock(imdb_id: str):
+    """Serializes writers of one movie's analysis and the artifacts derived from it."""
+    return path_lock(BASE / "cache" / "locks" / f"{imdb_id}.analysis.lock")
+
+def _columns_lock_path(imdb_id: str) -> Path:
+    # columnar's own swap/append lock, kept with the other lock files
+    return BASE / "cache" / "locks" / f"{imdb_id}.cols.lock"
+
+@timed("save_analysis")
+def _save_analysis(imdb_id: str, rows: List[Dict[str, Any]]) -> None:
+    # caller holds _analysis_lock(imdb_id)
+    if _sqlite():
+        persistence_sqlite.save_analysis(imdb_id, rows)
+    elif _columnar():
+        columnar.write(analysis_columns_path(imdb_id), rows, _columns_lock_path(imdb_id))
+        _cache.discard(analysis_columns_path(imdb_id))
+        analysis_path(imdb_id).unlink(missing_ok=True)
+        _cache.discard(analysis_path(imdb_id))
+    else:
+        _write_json(analysis_path(imdb_id), rows)
+        shutil.rmtree(analysis_columns_path(imdb_id), ignore_errors=True)
+    save_summary(imdb_id, SummaryAggregate.from_rows(rows))
+    save_rollup(imdb_id, TrendRollup.from_rows(rows))
+    save_search_index(imdb_id, SearchIndex.from_rows(rows))
+
+@timed("append_analysis")
+def _append_analysis(imdb_id: str, rows: List[Dict[str, Any]]) -> None:
+    # caller holds _analysis_lock(imdb_id)
+    if _sqlite():
+        persistence_sqlite.append_analysis(imdb_id, rows)
+    elif analysis_columns_path(imdb_id).exists():
+        columnar.append(analysis_columns_path(imdb_id), list(rows), _columns_lock_path(imdb_id))
+        _cache.discard(analysis_columns_path(imdb_id))
+    elif _columnar():
+        # legacy JSON analysis: convert while appending
+        columnar.write(analysis_columns_path(imdb_id), (load_analysis(imdb_id) or []) + list(rows),
+                       _columns_lock_path(imdb_id))
+        analysis_path(imdb_id).unlink(missing_ok=True)
+        _cache.discard(analysis_path(imdb_id))
+        _cache.discard(analysis_columns_path(imdb_id))
+    else:
+        _write_json(analysis_path(imdb_id), (load_analysis(imdb_id) or []) + list(rows))
+    agg = load_summary(imdb_id)
+    if agg is None:
+        agg = summarize_analysis(imdb_id) or SummaryAggregate()
+    else:
+        agg.extend(rows)
+    save_summary(imdb_id, agg)
+    rollup = load_rollup(imdb_id)
+    if rollup is None:
+        rollup = rollup_analysis(imdb_id) or TrendRollup()
+    else:
+        rollup.extend(rows)
+    save_rollup(imdb_id, rollup)
+    _append_search_index(imdb_id, rows)
+
 def save_analysis(imdb_id: str, rows: List[Dict[str, Any]]) -> None:
-    _write_json(analysis_path(imdb_id), rows)
+    with _analysis_lock(imdb_id):
+        _save_analysis(imdb_id, rows)
+
+def append_analysis(imdb_id: str, rows: List[Dict[str, Any]]) -> None:
+    """Add analysis rows after the existing ones and fold them into the summary."""
+    with _analysis_lock(imdb_id):
+        _append_analysis(imdb_id, rows)
+
+def update_analysis(imdb_id: str, rows: List[Dict[str, Any]], full: bool = False) -> None:
+    """Make `rows` the movie's analysis: only the new tail is appended when the
+    stored analysis is an unchanged prefix of it (see appended_rows), unless
+    `full`. The stored analysis is read under the write lock, so two analyses
+    of the same movie finishing together never append the same rows twice."""
+    with _analysis_lock(imdb_id):
+        added = None if full else appended_rows(load_analysis(imdb_id), rows)
+        if added is None:
+            _save_analysis(imdb_id, rows)
+        elif added:
+            _append_analysis(imdb_id, added)
+
+def load_analysis_columns(imdb_id: str) -> columnar.Columns | None:
+    """Memory-mapped columns of a columnar analysis, or None for other formats."""
+    path = analysis_columns_path(imdb_id)
+    if _sqlite() or not path.exists():
+        return None
+    return columnar.Columns(path, _columns_lock_path(imdb_id))
 
+@timed("load_analysis")
 def load_analysis(imdb_id: str) -> List[Dict[str, Any]] | None:
+    if _sqlite():
+        return persistence_sqlite.load_analysis(imdb_id)
+    path = analysis_columns_path(imdb_id)
+    if path.exists():
+        # compatibility view: the same list of row dicts the JSON format returns,
+        # cached until meta.json (the commit point of every write) changes
+        lock = _columns_lock_path(imdb_id)
+        return _cache.get(path, lambda: list(columnar.Columns(path, lock).iter_rows()) or None,
+                          stamp_path=path / columnar.META)
     return _read_json(analysis_path(imdb_id))
+
+def analysis_rows(imdb_id: str, positions: List[int]) -> List[Dict[str, Any]]:
+    """The analysis rows at the given positions, without decoding the others:
+    columnar reads them from the mapped columns, SQLite by row id (the id
+    list is cached until the analysis changes), JSON from the read cache."""
+    if _sqlite():
+        ids = _cache.get_stamped(f"sqlite:analysis-ids:{imdb_id}", persistence_sqlite.stamp("analysis", imdb_id),
+                                 lambda: persistence_sqlite.analysis_ids(imdb_id))
+        return persistence_sqlite.analysis_rows([ids[i] for i in positions])
+    cols = load_analysis_columns(imdb_id)
+    if cols is not None:
+        return [cols.row(i) for i in positions]
+    rows = load_analysis(imdb_id) or []
+    return [rows[i] for i in positions]
+
+def iter_analysis(imdb_id: str, start: int = 0) -> Iterator[Dict[str, Any]] | None:
+    """Analysis rows from position `start` on, read incrementally; None if there is no analysis."""
+    if _sqlite():
+        return persistence_sqlite.iter_analysis(imdb_id, start)
+    cols = load_analysis_columns(imdb_id)
+    if cols is not None:
+        return cols.iter_rows(start) if len(cols) else None
+    path = analysis_path(imdb_id)
+    if not path.exists():
+        return None
+
+    def rows() -> Iterator[Dict[str, Any]]:
+        with path.open("r", encoding="utf-8") as f:
+            for i, row in enumerate(iter_json_array(f)):
+                if i >= start:
+                    yield row
+    return rows()
+
+def summarize_analysis(imdb_id: str) -> SummaryAggregate | None:
+    """Summary aggregate recomputed from the stored analysis (vectorized when columnar)."""
+    cols = load_analysis_columns(imdb_id)
+    if cols is not None:
+        return cols.summary() if len(cols) else None
+    rows = load_analysis(imdb_id)
+    return SummaryAggregate.from_rows(rows) if rows else None
+
+def save_summary(imdb_id: str, agg: SummaryAggregate) -> None:
+    save_artifact("summaries", imdb_id, agg.to_dict())
+
+def load_summary(imdb_id: str) -> SummaryAggregate | None:
+    data = load_artifact("summaries", imdb_id)
+    return SummaryAggregate.from_dict(data) if data else None
+
+def rollup_analysis(imdb_id: str) -> TrendRollup | None:
+    """Trend rollup recomputed from the stored analysis."""
+    rows = iter_analysis(imdb_id)
+    return TrendRollup.from_rows(rows) if rows is not None else None
+
+def save_rollup(imdb_id: str, rollup: TrendRollup) -> None:
+    save_artifact("rollups", imdb_id, rollup.to_dict())
+
+def load_rollup(imdb_id: str) -> TrendRollup | None:
+    data = load_artifact("rollups", imdb_id)
+    return TrendRollup.from_dict(data) if data else None
+
+def save_search_index(imdb_id: str, index: SearchIndex) -> None:
+    # log first: a crash in between leaves the old index without its log,
+    # never a log whose positions don't follow the index
+    delete_artifact_log("search", imdb_id)
+    save_artifact("search", imdb_id, index.to_dict())
+
+def _search_segments(log: List[Dict[str, Any]], start: int) -> List[SearchIndex] | None:
+    """Logged segments in order, or None if they don't follow on from row `start` without a gap."""
+    segments = []
+    for record in log:
+        if record["start"] != start:
+            return None
+        segment = SearchIndex.from_dict(record)
+        segments.append(segment)
+        start += len(segment)
+    return segments
+
+def _append_search_index(imdb_id: str, rows: List[Dict[str, Any]]) -> None:
+    """Log the postings of appended rows; merge the log into the index once it
+    holds more than SEARCH_LOG_MAX_ROWS rows and a tenth of the index."""
+    log = load_artifact_log("search", imdb_id)
+    if log:
+        base_n = log[0]["start"]
+    else:
+        data = load_artifact("search", imdb_id)
+        base_n = len(data["lengths"]) if data else None
+    segments = _search_segments(log, base_n) if base_n is not None else None
+    if segments is None:
+        save_search_index(imdb_id, SearchIndex.from_rows(iter_analysis(imdb_id) or []))
+        return
+    segment = SearchIndex.from_rows(rows)
+    logged = sum(len(s) for s in segments) + len(segment)
+    if logged <= max(settings.SEARCH_LOG_MAX_ROWS, base_n // 10):
+        append_artifact_log("search", imdb_id, {"start": base_n + logged - len(segment), **segment.to_dict()})
+        return
+    data = load_artifact("search", imdb_id)
+    if data is None or len(data["lengths"]) != base_n:
+        save_search_index(imdb_id, SearchIndex.from_rows(iter_analysis(imdb_id) or []))
+        return
+    index = SearchIndex.from_dict(data, copy=True)
+    for s in segments + [segment]:
+        index.merge(s)
+    save_search_index(imdb_id, index)
+
+def load_search_index(imdb_id: str) -> List[SearchIndex] | None:
+    """The stored index followed by its logged segments, for search_parts().
+    Read-only: the parts may be shared through the read cache."""
+    if _sqlite():
+        # no file stamps here: the parsed index and log are cached until the
+        # "search" version changes
+        data, log = _cache.get_stamped(
+            f"sqlite:search:{imdb_id}", persistence_sqlite.stamp("search", imdb_id),
+            lambda: [persistence_sqlite.load_artifact("search", imdb_id),
+                     persistence_sqlite.load_artifact_log("search", imdb_id)])
+    else:
+        data, log = load_artifact("search", imdb_id), load_artifact_log("search", imdb_id)
+    if not data:
+        return None
+    index = SearchIndex.from_dict(data)
+    return [index] + (_search_segments(log, len(index)) or [])
@@ -0,0 +1,325 @@
+from __future__ import annotations
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from . import columnar
+from .config import settings
+
+_REVIEW_COLS = ("text", "source", "timestamp")
+_ANALYSIS_COLS = ("review_id", "text", "source", "timestamp", "label", "score")
+# rows per query when streaming the analysis
+_PAGE_ROWS = 1000
+# SQLite caps the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    imdb_id TEXT PRIMARY KEY,
+    meta TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    imdb_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    source TEXT,
+    timestamp TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS reviews_by_movie ON reviews (imdb_id, id);
+CREATE TABLE IF NOT EXISTS analysis (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    imdb_id TEXT NOT NULL,
+    review_id TEXT,
+    text TEXT NOT NULL,
+    source TEXT,
+    timestamp TEXT,
+    label TEXT NOT NULL,
+    score REAL NOT NULL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS analysis_by_movie ON analysis (imdb_id, id);
+CREATE TABLE IF NOT EXISTS artifacts (
+    kind TEXT NOT NULL,
+    imdb_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, imdb_id)
+);
+CREATE TABLE IF NOT EXISTS artifact_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    imdb_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifact_log_by_movie ON artifact_log (kind, imdb_id, seq);
+CREATE TABLE IF NOT EXISTS versions (
+    kind TEXT NOT NULL,
+    imdb_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (kind, imdb_id)
+) WITHOUT ROWID;
+"""
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready: set = set()
+
+
+def db_path() -> Path:
+    return Path(settings.SQLITE_PATH) if settings.SQLITE_PATH else Path(settings.DATA_DIR) / "store.sqlite3"
+
+
+def connect() -> sqlite3.Connection:
+    """Per-thread connection in WAL mode, so readers never block the writer."""
+    path = str(db_path())
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with _schema_lock:
+            if path not in _schema_ready:
+                conn.executescript(_SCHEMA)
+                _schema_ready.add(path)
+        conns[path] = conn
+    return conn
+
+
+def _pack(row: Dict[str, Any], cols: tuple) -> tuple:
+    extra = {k: v for k, v in row.items() if k not in cols}
+    return tuple(row.get(c) for c in cols) + (json.dumps(extra, ensure_ascii=False) if extra else None,)
+
+
+def _unpack(values: tuple, cols: tuple) -> Dict[str, Any]:
+    row = dict(zip(cols, values[:-1]))
+    if values[-1]:
+        row.update(json.loads(values[-1]))
+    return row
+
+
+def _insert(conn: sqlite3.Connection, table: str, cols: tuple, imdb_id: str, rows: Iterable[Dict[str, Any]]) -> None:
+    marks = ",".join("?" * (len(cols) + 2))
+    conn.executemany(
+        f"INSERT INTO {table} (imdb_id, {', '.join(cols)}, extra) VALUES ({marks})",
+        ((imdb_id, *_pack(r, cols)) for r in rows),
+    )
+
+
+def _bump(conn: sqlite3.Connection, kind: str, imdb_id: str) -> None:
+    conn.execute("INSERT INTO versions VALUES (?, ?, 1)"
+                 " ON CONFLICT (kind, imdb_id) DO UPDATE SET version = version + 1", (kind, imdb_id))
+
+
+def stamp(kind: str, imdb_id: str) -> Tuple[int, int]:
+    """Changes whenever the movie's `kind` data (an artifact and its log, or
+    "analysis") is written, here or in another process; for in-process caches."""
+    row = connect().execute("SELECT version FROM versions WHERE kind = ? AND imdb_id = ?", (kind, imdb_id)).fetchone()
+    return os.stat(db_path()).st_ino, row[0] if row else 0
+
+
+def _select(table: str, cols: tuple, imdb_id: str) -> List[Dict[str, Any]] | None:
+    cur = connect().execute(f"SELECT {', '.join(cols)}, extra FROM {table} WHERE imdb_id = ? ORDER BY id", (imdb_id,))
+    rows = [_unpack(v, cols) for v in cur]
+    return rows or None
+
+
+# -------- same API as persistence_json --------
+def save_movie_meta(imdb_id: str, meta: Dict[str, Any]) -> None:
+    conn = connect()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO movies VALUES (?, ?)", (imdb_id, json.dumps(meta, ensure_ascii=False)))
+
+
+def load_movie_meta(imdb_id: str) -> Dict[str, Any] | None:
+    row = connect().execute("SELECT meta FROM movies WHERE imdb_id = ?", (imdb_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def save_reviews(imdb_id: str, reviews: List[Dict[str, Any]]) -> None:
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM reviews WHERE imdb_id = ?", (imdb_id,))
+        _insert(conn, "reviews", _REVIEW_COLS, imdb_id, reviews)
+
+
+def save_reviews_stream(imdb_id: str, reviews: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+    conn = connect()
+    count = 0
+    with conn:
+        conn.execute("DELETE FROM reviews WHERE imdb_id = ?", (imdb_id,))
+        it = iter(reviews)
+        while True:
+            batch = list(itertools.islice(it, batch_size))
+            if not batch:
+                break
+            _insert(conn, "reviews", _REVIEW_COLS, imdb_id, batch)
+            count += len(batch)
+        if not count:
+            conn.rollback()
+    return count
+
+
+def append_reviews(imdb_id: str, reviews: List[Dict[str, Any]]) -> int:
+    conn = connect()
+    with conn:
+        _insert(conn, "reviews", _REVIEW_COLS, imdb_id, reviews)
+        return conn.execute("SELECT COUNT(*) FROM reviews WHERE imdb_id = ?", (imdb_id,)).fetchone()[0]
+
+
+def load_reviews(imdb_id: str) -> List[Dict[str, Any]] | None:
+    return _select("reviews", _REVIEW_COLS, imdb_id)
+
+
+def save_analysis(imdb_id: str, rows: List[Dict[str, Any]]) -> None:
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM analysis WHERE imdb_id = ?", (imdb_id,))
+        _insert(conn, "analysis", _ANALYSIS_COLS, imdb_id, rows)
+        _bump(conn, "analysis", imdb_id)
+
+
+def append_analysis(imdb_id: str, rows: List[Dict[str, Any]]) -> None:
+    conn = connect()
+    with conn:
+        _insert(conn, "analysis", _ANALYSIS_COLS, imdb_id, rows)
+        _bump(conn, "analysis", imdb_id)
+
+
+def load_analysis(imdb_id: str) -> List[Dict[str, Any]] | None:
+    return _select("analysis", _ANALYSIS_COLS, imdb_id)
+
+
+def analysis_ids(imdb_id: str) -> List[int]:
+    """Row ids of the movie's analysis in order (read from the index alone)."""
+    cur = connect().execute("SELECT id FROM analysis WHERE imdb_id = ? ORDER BY id", (imdb_id,))
+    return [r[0] for r in cur]
+
+
+def analysis_rows(ids: List[int]) -> List[Dict[str, Any]]:
+    """The analysis rows with these ids, in the order given."""
+    conn = connect()
+    found: Dict[int, Dict[str, Any]] = {}
+    for start in range(0, len(ids), _SQL_CHUNK):
+        chunk = ids[start:start + _SQL_CHUNK]
+        cur = conn.execute(f"SELECT id, {', '.join(_ANALYSIS_COLS)}, extra FROM analysis"
+                           f" WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        found.update((v[0], _unpack(v[1:], _ANALYSIS_COLS)) for v in cur)
+    return [found[i] for i in ids]
+
+
+def iter_analysis(imdb_id: str, start: int = 0) -> Iterator[Dict[str, Any]] | None:
+    """Analysis rows from position `start` on, fetched in keyset pages.
+
+    Each page is read through connect() on the thread consuming the
+    iterator: a streaming response may resume it on a different threadpool
+    thread, where the creating thread's connection cannot be used.
+    """
+    if connect().execute("SELECT 1 FROM analysis WHERE imdb_id = ? LIMIT 1", (imdb_id,)).fetchone() is None:
+        return None
+    select = f"SELECT id, {', '.join(_ANALYSIS_COLS)}, extra FROM analysis WHERE imdb_id = ?"
+
+    def rows() -> Iterator[Dict[str, Any]]:
+        page = connect().execute(f"{select} ORDER BY id LIMIT ? OFFSET ?", (imdb_id, _PAGE_ROWS, start)).fetchall()
+        while page:
+            for v in page:
+                yield _unpack(v[1:], _ANALYSIS_COLS)
+            if len(page) < _PAGE_ROWS:
+                return
+            page = connect().execute(f"{select} AND id > ? ORDER BY id LIMIT ?",
+                                     (imdb_id, page[-1][0], _PAGE_ROWS)).fetchall()
+    return rows()
+
+
+def save_artifact(kind: str, imdb_id: str, data: Any) -> None:
+    conn = connect()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?)",
+                     (kind, imdb_id, json.dumps(data, ensure_ascii=False)))
+        _bump(conn, kind, imdb_id)
+
+
+def load_artifact(kind: str, imdb_id: str) -> Any:
+    row = connect().execute("SELECT data FROM artifacts WHERE kind = ? AND imdb_id = ?", (kind, imdb_id)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def delete_artifact(kind: str, imdb_id: str) -> None:
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM artifacts WHERE kind = ? AND imdb_id = ?", (kind, imdb_id))
+        _bump(conn, kind, imdb_id)
+
+
+def list_artifacts(kind: str) -> List[str]:
+    cur = connect().execute("SELECT imdb_id FROM artifacts WHERE kind = ? ORDER BY imdb_id", (kind,))
+    return [r[0] for r in cur]
+
+
+def append_artifact_log(kind: str, imdb_id: str, record: Any) -> None:
+    conn = connect()
+    with conn:
+        conn.execute("INSERT INTO artifact_log (kind, imdb_id, data) VALUES (?, ?, ?)",
+                     (kind, imdb_id, json.dumps(record, ensure_ascii=False)))
+        _bump(conn, kind, imdb_id)
+
+
+def load_artifact_log(kind: str, imdb_id: str) -> List[Any]:
+    cur = connect().execute("SELECT data FROM artifact_log WHERE kind = ? AND imdb_id = ? ORDER BY seq", (kind, imdb_id))
+    return [json.loads(r[0]) for r in cur]
+
+
+def delete_artifact_log(kind: str, imdb_id: str) -> None:
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM artifact_log WHERE kind = ? AND imdb_id = ?", (kind, imdb_id))
+        _bump(conn, kind, imdb_id)
+
+
+# -------- migration from the JSON tree --------
+def migrate_from_json(data_dir: Path) -> Dict[str, int]:
+    """Import movies/, reviews/ and analysis/ (JSON or columnar) into the SQLite store."""
+    counts = {"movies": 0, "reviews": 0, "analysis": 0}
+
+    def read(p: Path) -> Any:
+        return json.loads(p.read_text(encoding="utf-8"))
+
+    for p in sorted((data_dir / "movies").glob("*.json")):
+        save_movie_meta(p.stem, read(p))
+        counts["movies"] += 1
+    for p in sorted((data_dir / "reviews").glob("*_raw.json")):
+        rows = read(p) or []
+        save_reviews(p.name[: -len("_raw.json")], rows)
+        counts["reviews"] += len(rows)
+    for p in sorted((data_dir / "analysis").glob("*_sentiment.json")):
+        rows = read(p) or []
+        save_analysis(p.name[: -len("_sentiment.json")], rows)
+        counts["analysis"] += len(rows)
+    for p in sorted((data_dir / "analysis").glob("*_sentiment.cols")):
+        rows = list(columnar.Columns(p).iter_rows())
+        save_analysis(p.name[: -len("_sentiment.cols")], rows)
+        counts["analysis"] += len(rows)
+    return counts
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite storage backend maintenance")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    mig = sub.add_parser("migrate", help="import the JSON data tree into the SQLite store")
+    mig.add_argument("--data-dir", default=settings.DATA_DIR)
+    args = parser.parse_args()
+    if args.cmd == "migrate":
+        counts = migrate_from_json(Path(args.data_dir))
+        print(json.dumps({"db": str(db_path()), **counts}))
+
+
+if __name__ == "__main__":
+    _main()
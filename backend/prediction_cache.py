@@ -0,0 +1,157 @@
+from __future__ import annotations
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import settings
+
+# SQLite caps the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+
+def text_key(text: str) -> str:
+    """Content hash of a review text, insensitive to whitespace differences."""
+    normalized = " ".join(text.split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class PredictionCache:
+    """Two-tier cache of model predictions keyed by (model name, text hash).
+
+    The memory tier is a bounded LRU; the disk tier is a SQLite table that
+    survives restarts. Entries are only ever served for the model they were
+    produced by, and switching models drops everything cached for the old one.
+    """
+
+    def __init__(self, db_path: Path | None, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._db_path = db_path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._model: str | None = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # -- disk tier --
+    def _db(self) -> sqlite3.Connection | None:
+        if self._db_path is None:
+            return None
+        if self._conn is None:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            # WAL and a busy timeout: workers sharing the file wait for each
+            # other's writes instead of failing with "database is locked"
+            conn = sqlite3.connect(str(self._db_path), timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " model TEXT NOT NULL, key TEXT NOT NULL, label TEXT NOT NULL, score REAL NOT NULL,"
+                " PRIMARY KEY (model, key)) WITHOUT ROWID"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _switch_model(self, model: str) -> None:
+        if self._model == model:
+            return
+        self._mem.clear()
+        db = self._db()
+        if db is not None:
+            db.execute("DELETE FROM predictions WHERE model != ?", (model,))
+            db.commit()
+        self._model = model
+
+    def _remember(self, key: str, pred: Dict[str, Any]) -> None:
+        self._mem[key] = pred
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    # -- public API --
+    def lookup(self, model: str, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Return the cached prediction for each key, or None where missing."""
+        with self._lock:
+            self._switch_model(model)
+            out: List[Optional[Dict[str, Any]]] = []
+            missing: Dict[str, List[int]] = {}
+            for i, k in enumerate(keys):
+                pred = self._mem.get(k)
+                if pred is not None:
+                    self._mem.move_to_end(k)
+                    self.hits += 1
+                    out.append(dict(pred))
+                else:
+                    out.append(None)
+                    missing.setdefault(k, []).append(i)
+
+            db = self._db()
+            if missing and db is not None:
+                pending = list(missing)
+                for start in range(0, len(pending), _SQL_CHUNK):
+                    chunk = pending[start:start + _SQL_CHUNK]
+                    marks = ",".join("?" * len(chunk))
+                    cur = db.execute(
+                        f"SELECT key, label, score FROM predictions WHERE model = ? AND key IN ({marks})",
+                        (model, *chunk),
+                    )
+                    for k, label, score in cur:
+                        pred = {"label": label, "score": float(score)}
+                        self._remember(k, pred)
+                        for i in missing.pop(k):
+                            out[i] = dict(pred)
+                            self.disk_hits += 1
+
+            self.misses += sum(len(v) for v in missing.values())
+            return out
+
+    def store(self, model: str, items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        with self._lock:
+            self._switch_model(model)
+            rows = []
+            for k, pred in items:
+                pred = {"label": pred["label"], "score": float(pred["score"])}
+                self._remember(k, pred)
+                rows.append((model, k, pred["label"], pred["score"]))
+            db = self._db()
+            if rows and db is not None:
+                db.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)", rows)
+                db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            db = self._db()
+            if db is not None:
+                db.execute("DELETE FROM predictions")
+                db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "model": self._model,
+                "memory_entries": len(self._mem),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache: PredictionCache | None = None
+
+
+def get_cache() -> PredictionCache | None:
+    global _cache
+    if not settings.PREDICTION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        db_path = Path(settings.DATA_DIR) / "cache" / "predictions.sqlite3" if settings.PREDICTION_CACHE_DISK else None
+        _cache = PredictionCache(db_path, max_entries=settings.PREDICTION_CACHE_SIZE)
+    return _cache
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import datetime
+import re
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List
+
+INTERVALS = ("day", "week", "month")
+UNKNOWN_SOURCE = "unknown"
+_DATE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+
+
+def source_class(source: Any) -> str:
+    """Kind of a review source: "tmdb" for "tmdb:<author>", "user", ..."""
+    return str(source or UNKNOWN_SOURCE).split(":", 1)[0] or UNKNOWN_SOURCE
+
+
+def review_date(ts: Any) -> datetime.date | None:
+    """UTC calendar date of a review timestamp (ISO string or epoch seconds)."""
+    if ts is None or ts == "":
+        return None
+    try:
+        if isinstance(ts, (int, float)):
+            return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).date()
+        dt = datetime.datetime.fromisoformat(str(ts).strip())
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(datetime.timezone.utc)
+        return dt.date()
+    except (ValueError, OverflowError, OSError):
+        m = _DATE.match(str(ts))
+        if not m:
+            return None
+        try:
+            return datetime.date(int(m[1]), int(m[2]), int(m[3]))
+        except ValueError:
+            return None
+
+
+def periods(day: datetime.date) -> Dict[str, str]:
+    """Bucket key of a date per interval; keys sort chronologically as strings."""
+    year, week, _ = day.isocalendar()
+    return {"day": day.isoformat(), "week": f"{year}-W{week:02d}", "month": f"{day.year}-{day.month:02d}"}
+
+
+@lru_cache(maxsize=4096)
+def _periods_of_day(prefix: str) -> Dict[str, str] | None:
+    day = review_date(prefix)
+    return periods(day) if day else None
+
+
+def timestamp_periods(ts: Any) -> Dict[str, str] | None:
+    """periods() of a review timestamp, or None if it has no usable date."""
+    if isinstance(ts, str):
+        ts = ts.strip()
+        # UTC ("...Z") or naive: the date is the prefix, so skip the full parse
+        if ts.endswith("Z") or not any(c in ts[10:] for c in "+-"):
+            return _periods_of_day(ts[:10])
+    day = review_date(ts)
+    return periods(day) if day else None
+
+
+class TrendRollup:
+    """Per-source-class sentiment counts bucketed by day, ISO week and month.
+
+    Maintained like SummaryAggregate as analysis rows arrive, so a trend
+    query reads one bucket per period and source instead of every row.
+    Each bucket is [positives, negatives, neutral, score sum]; rows whose
+    timestamp cannot be read are only counted in `undated`. Sources are
+    keyed by class (source_class), not per TMDb author, which keeps the
+    rollup small and a query to a few series whatever the review count.
+    """
+
+    def __init__(self) -> None:
+        self.buckets: Dict[str, Dict[str, Dict[str, List[float]]]] = {i: {} for i in INTERVALS}
+        self.undated: Dict[str, int] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "TrendRollup":
+        rollup = cls()
+        rollup.extend(rows)
+        return rollup
+
+    def add(self, row: Dict[str, Any]) -> None:
+        source = source_class(row.get("source"))
+        keys = timestamp_periods(row.get("timestamp"))
+        if keys is None:
+            self.undated[source] = self.undated.get(source, 0) + 1
+            return
+        label = (row.get("label") or "").upper()
+        slot = 0 if label.startswith("POS") else 1 if label.startswith("NEG") else 2
+        score = float(row.get("score", 0.0))
+        for interval, period in keys.items():
+            bucket = self.buckets[interval].setdefault(source, {}).setdefault(period, [0, 0, 0, 0.0])
+            bucket[slot] += 1
+            bucket[3] += score
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for r in rows:
+            self.add(r)
+
+    def sources(self) -> List[str]:
+        return sorted(set(self.buckets["day"]) | set(self.undated))
+
+    def series(self, interval: str, source: str | None = None) -> Dict[str, Any]:
+        """Trend points for `interval`, limited to source classes matching the glob
+        `source`; anything after a ":" is ignored, so "tmdb:*" selects "tmdb"."""
+        merged: Dict[str, List[float]] = {}
+        pattern = source_class(source) if source is not None else None
+        matched = [s for s in self.sources() if pattern is None or fnmatchcase(s, pattern)]
+        for s in matched:
+            for period, (pos, neg, neu, score_sum) in self.buckets[interval].get(s, {}).items():
+                acc = merged.setdefault(period, [0, 0, 0, 0.0])
+                acc[0] += pos
+                acc[1] += neg
+                acc[2] += neu
+                acc[3] += score_sum
+        points = []
+        for period in sorted(merged):
+            pos, neg, neu, score_sum = merged[period]
+            total = pos + neg + neu
+            points.append({
+                "period": period,
+                "total": total,
+                "positives": pos,
+                "negatives": neg,
+                "neutral": neu,
+                "avg_score": round(score_sum / total, 4),
+            })
+        return {
+            "interval": interval,
+            "source": source,
+            "sources": matched,
+            "points": points,
+            "undated": sum(self.undated.get(s, 0) for s in matched),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"buckets": self.buckets, "undated": self.undated}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrendRollup":
+        rollup = cls()
+        for interval, by_source in data["buckets"].items():
+            rollup.buckets[interval] = {
+                s: {period: list(b) for period, b in buckets.items()} for s, buckets in by_source.items()
+            }
+        rollup.undated = dict(data["undated"])
+        return rollup
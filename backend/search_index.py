@@ -0,0 +1,149 @@
+from __future__ import annotations
+import math
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Per-movie inverted index over the analysis texts, stored as the "search"
+# artifact and kept in step with the analysis by persistence_json: rebuilt by
+# save_analysis, while append_analysis writes the new rows' postings to an
+# append-only log that is merged into the index once it grows. Rows are
+# addressed by their position in the analysis. A query only walks the postings of its own terms,
+# ranks with BM25 and filters on the label/score columns kept in the index.
+KIND = "search"
+K1, B = 1.2, 0.75
+_WORD = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have he her his i if in into is it its "
+    "me my of on or our she so than that the their them then there they this to was we "
+    "were what when which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words of the text, stopwords and single characters dropped."""
+    return [w for w in _WORD.findall(text.lower().replace("’", "'")) if len(w) > 1 and w not in STOPWORDS]
+
+
+class SearchIndex:
+    """Postings per term, plus each row's length, label and score.
+
+    A posting list holds row positions in ascending order, a position
+    repeated once per occurrence of the term in that row, which keeps the
+    stored index a plain JSON object of int lists.
+    """
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, List[int]] = {}
+        self.lengths: List[int] = []
+        self.labels: List[str] = []
+        self.scores: List[float] = []
+        self.total_length = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "SearchIndex":
+        index = cls()
+        index.extend(rows)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        pos = len(self.lengths)
+        words = tokenize(row.get("text") or "")
+        for w in words:
+            self.postings.setdefault(w, []).append(pos)
+        self.lengths.append(len(words))
+        self.total_length += len(words)
+        self.labels.append(row.get("label") or "")
+        self.scores.append(float(row.get("score", 0.0)))
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for r in rows:
+            self.add(r)
+
+    def merge(self, other: "SearchIndex") -> None:
+        """Append the rows of `other`, which follow this index's rows."""
+        n = len(self.lengths)
+        for term, plist in other.postings.items():
+            self.postings.setdefault(term, []).extend(pos + n for pos in plist)
+        self.lengths.extend(other.lengths)
+        self.labels.extend(other.labels)
+        self.scores.extend(other.scores)
+        self.total_length += other.total_length
+
+    def search(
+        self,
+        query: str,
+        label: str | None = None,
+        min_score: float | None = None,
+    ) -> List[Tuple[int, float]]:
+        return search_parts([self], query, label=label, min_score=min_score)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "postings": self.postings,
+            "lengths": self.lengths,
+            "labels": self.labels,
+            "scores": self.scores,
+            "total_length": self.total_length,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], copy: bool = False) -> "SearchIndex":
+        """Index over stored data; pass copy=True before extending it, so the
+        loaded lists (which may be shared through the read cache) stay untouched."""
+        index = cls()
+        postings = data["postings"]
+        index.postings = {t: list(p) for t, p in postings.items()} if copy else postings
+        index.lengths = list(data["lengths"]) if copy else data["lengths"]
+        index.labels = list(data["labels"]) if copy else data["labels"]
+        index.scores = list(data["scores"]) if copy else data["scores"]
+        index.total_length = data["total_length"]
+        return index
+
+
+def search_parts(
+    parts: List[SearchIndex],
+    query: str,
+    label: str | None = None,
+    min_score: float | None = None,
+) -> List[Tuple[int, float]]:
+    """Matching (row position, BM25 rank) pairs, best first, earliest row on ties.
+
+    `parts` are searched as one index whose rows are those of each part in
+    turn (a stored index followed by its log of appended rows). A row
+    matches if it contains any query term; rows with more and rarer terms
+    rank higher.
+    """
+    n = sum(len(p) for p in parts)
+    if not n:
+        return []
+    avgdl = sum(p.total_length for p in parts) / n or 1.0
+    wanted = label.upper() if label else None
+    ranks: Dict[int, float] = {}
+    for term in dict.fromkeys(tokenize(query)):
+        # (part, offset, tf per local position) for each part holding the term
+        found = []
+        offset = 0
+        for part in parts:
+            plist = part.postings.get(term)
+            if plist:
+                tfs: Dict[int, int] = {}
+                for pos in plist:
+                    tfs[pos] = tfs.get(pos, 0) + 1
+                found.append((part, offset, tfs))
+            offset += len(part)
+        df = sum(len(tfs) for _, _, tfs in found)
+        if not df:
+            continue
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for part, offset, tfs in found:
+            for pos, tf in tfs.items():
+                if wanted and part.labels[pos].upper() != wanted:
+                    continue
+                if min_score is not None and part.scores[pos] < min_score:
+                    continue
+                norm = K1 * (1 - B + B * part.lengths[pos] / avgdl)
+                ranks[offset + pos] = ranks.get(offset + pos, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+    return sorted(ranks.items(), key=lambda item: (-item[1], item[0]))
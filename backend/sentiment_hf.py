@@ -1,65 +1,211 @@
 from __future__ import annotations
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import os
+import sqlite3
+import threading
+import time
+
+from .config import settings
+from . import inference_pool, lexicon, metrics
+from .hf_engines import load_engine
+from .prediction_cache import get_cache, text_key
 
 def _fallback_predict(texts: List[str]) -> List[Dict[str, Any]]:
-    out = []
-    pos_words = {"good", "great", "love", "amazing", "stunning", "awesome", "breathtaking", "fantastic", "enjoyed"}
-    neg_words = {"bad", "boring", "slow", "terrible", "awful", "overhyped", "hate", "dull", "disappointing"}
-    for t in texts:
-        tl = t.lower()
-        p = sum(w in tl for w in pos_words)
-        n = sum(w in tl for w in neg_words)
-        if p > n:
-            out.append({"label": "POSITIVE", "score": 0.85})
-        elif n > p:
-            out.append({"label": "NEGATIVE", "score": 0.85})
-        else:
-            out.append({"label": "NEUTRAL", "score": 0.60})
-    return out
+    # Lexicon scorer: each text is tokenized with one bytes.translate + split and
+    # its tokens looked up in a word table (stems, phrases, negation windows)
+    return lexicon.score_batch(texts)
 
 _pipeline = None
+_engine = settings.HF_ENGINE
+_pipeline_lock = threading.Lock()
+
+def _model_name() -> str:
+    return os.getenv("HF_MODEL_NAME", "distilbert-base-uncased-finetuned-sst-2-english")
+
+def _model_key() -> str:
+    """Cache namespace: quantized/ONNX outputs differ slightly from fp32 torch."""
+    return _model_name() if _engine == "torch" else f"{_model_name()}@{_engine}"
+
+def _lightweight() -> bool:
+    return os.getenv("LIGHTWEIGHT_MODE", "0") in {"1", "true", "True"}
 
 def _get_pipeline():
-    global _pipeline
+    global _pipeline, _engine
     if _pipeline is not None:
         return _pipeline
     # Lightweight mode skips HF model to save memory
-    if os.getenv("LIGHTWEIGHT_MODE", "0") in {"1", "true", "True"}:
+    if _lightweight():
         _pipeline = None
         return None
-    try:
-        from transformers import pipeline
-        model_name = os.getenv("HF_MODEL_NAME", "distilbert-base-uncased-finetuned-sst-2-english")
-        _pipeline = pipeline(
-            "sentiment-analysis",
-            model=model_name,
-            device=-1,  # CPU only
-            truncation=True
-        )
-        return _pipeline
-    except Exception:
+    # one loader at a time: requests arriving during warm-up wait for it
+    with _pipeline_lock:
+        if _pipeline is not None:
+            return _pipeline
+        for engine in dict.fromkeys([settings.HF_ENGINE, "torch"]):
+            try:
+                _pipeline = load_engine(engine, _model_name())
+                _engine = engine
+                return _pipeline
+            except Exception as e:
+                if engine != "torch":
+                    print(f"HF engine {engine!r} unavailable ({e}); falling back to torch")
         _pipeline = None
         return None
 
+# -------- Startup preloading (PRELOAD_MODEL) --------
+WARMUP_TEXTS = [
+    "A great movie with stunning visuals.",
+    "Boring, slow and far too long; I would not watch it again.",
+]
+_warmup: Dict[str, Any] = {"ready": False}
+
+def warm_up() -> Dict[str, Any]:
+    """Import and load the model, then run one warm-up batch, recording timings.
+
+    Falls back to warming the lexicon scorer when the model is unavailable.
+    """
+    timings: Dict[str, float] = {}
+    try:
+        t0 = time.perf_counter()
+        if not _lightweight():
+            try:
+                import transformers  # noqa: F401  (timed separately from the model load)
+            except Exception:
+                pass
+        timings["import_s"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        pipe = _get_pipeline()
+        timings["load_s"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        if pipe is not None:
+            _run_pipeline(pipe, WARMUP_TEXTS)
+        else:
+            _fallback_predict(WARMUP_TEXTS)
+        timings["warmup_s"] = time.perf_counter() - t0
+        _warmup.update(engine=_engine if pipe is not None else "lexicon", error=None)
+    except Exception as e:
+        print(f"Model warm-up failed: {e}")
+        _warmup.update(engine="lexicon", error=str(e))
+    _warmup.update(ready=True, timings={k: round(v, 4) for k, v in timings.items()})
+    return dict(_warmup)
+
+def start_warm_up() -> None:
+    """Run warm_up() in a background thread so the server can answer meanwhile."""
+    _warmup.update(ready=False, started_at=time.time())
+    threading.Thread(target=warm_up, name="model-warm-up", daemon=True).start()
+
+def readiness() -> Dict[str, Any]:
+    if not settings.PRELOAD_MODEL:
+        return {"ready": True, "preload": False}
+    return {"preload": True, **_warmup}
+
+@metrics.timed("tokenize")
+def _token_lengths(pipe, texts: List[str]) -> List[int]:
+    tokenizer = getattr(pipe, "tokenizer", None)
+    if tokenizer is None:
+        # rough estimate (~4 characters per token) for pipelines without a tokenizer
+        return [len(t) // 4 + 2 for t in texts]
+    enc = tokenizer(texts, truncation=True, max_length=512)
+    return [len(ids) for ids in enc["input_ids"]]
+
+def _make_buckets(lengths: List[int], token_budget: int, max_batch: int) -> List[List[int]]:
+    """Group indices of similar length so each batch stays under the padded-token budget."""
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    buckets: List[List[int]] = []
+    cur: List[int] = []
+    for i in order:
+        # ascending order: the current text sets the padded width of the bucket
+        if cur and (len(cur) >= max_batch or (len(cur) + 1) * lengths[i] > token_budget):
+            buckets.append(cur)
+            cur = []
+        cur.append(i)
+    if cur:
+        buckets.append(cur)
+    return buckets
+
+def _run_pipeline(pipe, texts: List[str]) -> List[Dict[str, Any]]:
+    lengths = _token_lengths(pipe, texts)
+    buckets = _make_buckets(lengths, settings.HF_BATCH_TOKEN_BUDGET, settings.HF_MAX_BATCH_SIZE)
+    out: List[Dict[str, Any]] = [None] * len(texts)  # type: ignore[list-item]
+    for bucket in buckets:
+        metrics.BATCH_SIZE.observe(len(bucket))
+        with metrics.STAGE_SECONDS.time(stage="forward"):
+            results = pipe([texts[i] for i in bucket], batch_size=len(bucket))
+        for i, r in zip(bucket, results):
+            label = r.get("label", "").upper()
+            score = float(r.get("score", 0.0))
+            out[i] = {"label": label, "score": score}
+    return out
+
 def predict(texts: List[str]) -> List[Dict[str, Any]]:
+    return predict_with_engine(texts)[0]
+
+@metrics.timed("predict")
+def predict_with_engine(texts: List[str]) -> Tuple[List[Dict[str, Any]], str]:
+    """predict(), plus the engine that produced the results ("lexicon" for the fallback)."""
     pipe = _get_pipeline()
     if pipe is None:
-        return _fallback_predict(texts)
+        metrics.FALLBACKS.inc(reason="no_model")
+        metrics.PREDICTED_TEXTS.inc(len(texts), engine="lexicon")
+        return _fallback_predict(texts), "lexicon"
     
     # จำกัดความยาวของข้อความเพื่อป้องกัน token sequence ยาวเกินไป
     MAX_TEXT_LENGTH = 500  # ประมาณ 500 ตัวอักษรควรจะอยู่ภายใน 512 tokens
     truncated_texts = [text[:MAX_TEXT_LENGTH] if len(text) > MAX_TEXT_LENGTH else text for text in texts]
-    
+
+    # Serve repeated texts from the prediction cache; only unseen texts hit the model
+    cache = get_cache()
+    model = _model_key()
+    keys = [text_key(t) for t in truncated_texts]
+    out: List[Dict[str, Any] | None] = [None] * len(texts)
+    if cache:
+        # the cache is only a shortcut: a disk tier error (e.g. "database is
+        # locked" between workers) must not fail the prediction
+        try:
+            out = cache.lookup(model, keys)
+        except sqlite3.Error as e:
+            print(f"Prediction cache lookup failed: {e}")
+    pending: Dict[str, List[int]] = {}
+    for i, (k, p) in enumerate(zip(keys, out)):
+        if p is None:
+            pending.setdefault(k, []).append(i)
+    if cache:
+        misses = sum(map(len, pending.values()))
+        metrics.CACHE_LOOKUPS.inc(len(texts) - misses, cache="prediction", result="hit")
+        metrics.CACHE_LOOKUPS.inc(misses, cache="prediction", result="miss")
+    if not pending:
+        return out, _engine
+
     try:
-        results = pipe(truncated_texts)
-        out = []
-        for r in results:
-            label = r.get("label", "").upper()
-            score = float(r.get("score", 0.0))
-            out.append({"label": label, "score": score})
-        return out
+        todo = [truncated_texts[idx[0]] for idx in pending.values()]
+        t0 = time.perf_counter()
+        if inference_pool.enabled_for(len(todo)):
+            results = inference_pool.run_sharded(todo)
+        else:
+            results = _run_pipeline(pipe, todo)
+        elapsed = time.perf_counter() - t0
+        metrics.STAGE_SECONDS.observe(elapsed, stage="inference")
+        metrics.PREDICTED_TEXTS.inc(len(todo), engine=_engine)
+        if elapsed > 0:
+            metrics.TEXTS_PER_SECOND.set(len(todo) / elapsed, engine=_engine)
     except Exception as e:
         print(f"Error in sentiment analysis: {str(e)}")
+        metrics.FALLBACKS.inc(reason="error")
+        metrics.PREDICT_ERRORS.inc(exception=type(e).__name__)
+        metrics.PREDICTED_TEXTS.inc(len(texts), engine="lexicon")
         # ใช้ fallback เมื่อเกิดข้อผิดพลาด
-        return _fallback_predict(texts)
+        return _fallback_predict(texts), "lexicon"
+
+    for idx, pred in zip(pending.values(), results):
+        for i in idx:
+            out[i] = dict(pred)
+    if cache:
+        try:
+            cache.store(model, zip(pending.keys(), results))
+        except sqlite3.Error as e:
+            print(f"Prediction cache store failed: {e}")
+    return out, _engine
+
+def cache_stats() -> Dict[str, Any]:
+    cache = get_cache()
+    return cache.stats() if cache else {"enabled": False}
@@ -0,0 +1,213 @@
+"""Pre-fork server: load the model once, then fork uvicorn workers that share it.
+
+    python -m backend.serve [--workers 4] [--host 0.0.0.0] [--port 8000] [--app backend.app:app]
+
+The parent imports the app and loads the sentiment model, freezes the GC so
+those objects are never written to again, binds the listening socket and
+forks the workers. Model weights therefore stay in copy-on-write pages
+shared by every worker, and each extra worker costs only its own heap.
+The parent restarts workers that die, forwards SIGTERM/SIGINT, and logs
+every worker's unique (USS) and proportional (PSS) memory once they have
+started and again on SIGUSR1.
+
+Linux/macOS only (needs fork); memory figures need Linux's /proc.
+"""
+from __future__ import annotations
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .config import settings
+
+WORKER_ENV = "MSA_WORKER"
+# Set to "1" only in worker 0 of the first start: restarted workers must not
+# re-queue jobs that the live workers are still running
+RESUME_ENV = "MSA_RESUME_JOBS"
+# A worker that dies sooner than this after starting is treated as a startup failure
+_MIN_UPTIME = 2.0
+
+
+def memory_usage(pid: int) -> Dict[str, int] | None:
+    """RSS, PSS and USS (private pages) of a process in bytes, from /proc/<pid>/smaps_rollup."""
+    try:
+        text = Path(f"/proc/{pid}/smaps_rollup").read_text()
+    except OSError:
+        return None
+    kb: Dict[str, int] = {}
+    for line in text.splitlines()[1:]:
+        key, _, rest = line.partition(":")
+        parts = rest.split()
+        if parts and parts[0].isdigit():
+            kb[key] = int(parts[0])
+    return {
+        "rss": kb.get("Rss", 0) * 1024,
+        "pss": kb.get("Pss", 0) * 1024,
+        "uss": (kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) * 1024,
+    }
+
+
+def memory_report(parent: int, workers: Dict[int, int]) -> List[str]:
+    """One line per process: the parent, then each worker by index."""
+    lines = []
+    for name, pid in [("parent", parent)] + [(f"worker {i}", pid) for pid, i in sorted(workers.items(), key=lambda w: w[1])]:
+        mem = memory_usage(pid)
+        if mem is None:
+            lines.append(f"{name} (pid {pid}): memory figures unavailable")
+            continue
+        mb = {k: v / 2**20 for k, v in mem.items()}
+        lines.append(f"{name} (pid {pid}): uss {mb['uss']:.1f} MB, pss {mb['pss']:.1f} MB, rss {mb['rss']:.1f} MB")
+    return lines
+
+
+def preload(app_path: str) -> Any:
+    """Import the app and load the model in the parent, then freeze the GC.
+
+    Only the load happens here: running inference would start torch's thread
+    pools, which must not exist when forking. Workers warm up on their own
+    (PRELOAD_MODEL) or on their first request.
+    """
+    import uvicorn
+    from . import lexicon, sentiment_hf
+
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    gc.disable()
+    app = uvicorn.importer.import_from_string(app_path)
+    t0 = time.perf_counter()
+    pipe = sentiment_hf._get_pipeline()
+    lexicon.get_lexicon()
+    print(f"[serve] {'model ' + sentiment_hf._engine if pipe is not None else 'lexicon scorer'} "
+          f"loaded in {time.perf_counter() - t0:.1f}s")
+    # move everything loaded so far out of the collector's reach: its
+    # bookkeeping writes would otherwise un-share those pages in each worker
+    gc.collect()
+    gc.freeze()
+    gc.enable()
+    return app
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(index: int, app: Any, sock: socket.socket, threads: int, log_level: str,
+                resume_jobs: bool = False) -> None:
+    import uvicorn
+
+    os.environ[WORKER_ENV] = str(index)
+    os.environ[RESUME_ENV] = "1" if resume_jobs else "0"
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+    # `kill -USR1` on the whole process group should only reach the parent's report
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(app_path: str, host: str, port: int, workers: int, threads: int, log_level: str = "info",
+          report_after: float = 10.0) -> int:
+    """Run the pre-fork server until SIGTERM/SIGINT; returns the exit status."""
+    app = preload(app_path)
+    sock = bind(host, port)
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    children: Dict[int, int] = {}  # pid -> worker index
+    started: Dict[int, float] = {}
+    stopping = False
+    status = 0
+
+    def spawn(index: int, resume_jobs: bool = False) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(index, app, sock, threads, log_level, resume_jobs)
+            except BaseException as e:
+                print(f"[serve] worker {index} failed: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+        started[pid] = time.monotonic()
+
+    def stop(signum: int, _frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report(*_: Any) -> None:
+        for line in memory_report(os.getpid(), children):
+            print(f"[serve] {line}", flush=True)
+
+    print(f"[serve] listening on http://{host}:{port} with {workers} workers, {threads} torch threads each")
+    for i in range(workers):
+        spawn(i, resume_jobs=i == 0)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, report)
+
+    report_at = time.monotonic() + report_after if report_after > 0 else 0.0
+    while children:
+        try:
+            pid, wait_status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if report_at and time.monotonic() >= report_at:
+                report()
+                report_at = 0.0
+            time.sleep(0.2)
+            continue
+        index = children.pop(pid)
+        uptime = time.monotonic() - started.pop(pid)
+        code = os.waitstatus_to_exitcode(wait_status)
+        if stopping:
+            continue
+        print(f"[serve] worker {index} (pid {pid}) exited with {code}", file=sys.stderr)
+        if uptime < _MIN_UPTIME:
+            # failing at startup (bad app, port in use...): restarting would only loop
+            status = 1
+            stop(signal.SIGTERM, None)
+            continue
+        spawn(index)
+    sock.close()
+    return status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--app", default="backend.app:app", help="ASGI app as module:attribute")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=settings.SERVE_THREADS_PER_WORKER,
+                        help="torch threads per worker (0 = CPU count / workers)")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--report-after", type=float, default=10.0,
+                        help="seconds after start to log per-worker memory (0 = only on SIGUSR1)")
+    args = parser.parse_args()
+    sys.exit(serve(args.app, args.host, args.port, max(1, args.workers), args.threads,
+                   args.log_level, args.report_after))
+
+
+if __name__ == "__main__":
+    main()
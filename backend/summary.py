@@ -0,0 +1,91 @@
+from __future__ import annotations
+import heapq
+from typing import Any, Dict, Iterable, List
+
+TOP_K = 5
+
+
+class SummaryAggregate:
+    """Running totals behind /api/summary, maintained as analysis rows arrive.
+
+    Counts and the score sum are plain accumulators; the top quotes are kept
+    in bounded min-heaps of (score, -row index, text), so ties resolve to the
+    earliest row exactly like a stable descending sort would.
+    """
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.positives = 0
+        self.negatives = 0
+        self.score_sum = 0.0
+        self.top_pos: List[list] = []
+        self.top_neg: List[list] = []
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "SummaryAggregate":
+        agg = cls()
+        agg.extend(rows)
+        return agg
+
+    @staticmethod
+    def _push(heap: List[list], item: list) -> None:
+        if len(heap) < TOP_K:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        idx = self.total
+        self.total += 1
+        score = row.get("score", 0.0)
+        self.score_sum += score
+        label = row["label"].upper()
+        if label.startswith("POS"):
+            self.positives += 1
+            self._push(self.top_pos, [score, -idx, row["text"]])
+        elif label.startswith("NEG"):
+            self.negatives += 1
+            self._push(self.top_neg, [score, -idx, row["text"]])
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for r in rows:
+            self.add(r)
+
+    def response(self, imdb_id: str) -> Dict[str, Any]:
+        """Payload matching models.SummaryResponse."""
+        total = self.total
+        pos, neg = self.positives, self.negatives
+        return {
+            "imdb_id": imdb_id,
+            "total": total,
+            "positives": pos,
+            "negatives": neg,
+            "neutral": total - pos - neg,
+            "positivity_ratio": round(pos/total, 4) if total else 0.0,
+            "avg_confidence": round(self.score_sum / total, 4) if total else 0.0,
+            "top_positive_quotes": [t[2] for t in sorted(self.top_pos, reverse=True)],
+            "top_negative_quotes": [t[2] for t in sorted(self.top_neg, reverse=True)],
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "positives": self.positives,
+            "negatives": self.negatives,
+            "score_sum": self.score_sum,
+            "top_pos": self.top_pos,
+            "top_neg": self.top_neg,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SummaryAggregate":
+        agg = cls()
+        agg.total = data["total"]
+        agg.positives = data["positives"]
+        agg.negatives = data["negatives"]
+        agg.score_sum = data["score_sum"]
+        agg.top_pos = [list(t) for t in data["top_pos"]]
+        agg.top_neg = [list(t) for t in data["top_neg"]]
+        heapq.heapify(agg.top_pos)
+        heapq.heapify(agg.top_neg)
+        return agg
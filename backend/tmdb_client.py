@@ -1,9 +1,18 @@
 from __future__ import annotations
-import requests
-from typing import Any, Dict, List
+import asyncio
+import httpx
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
 from .config import settings
+from .http_client import get_client
+from . import metrics
 
 TMDB_BASE = "https://api.themoviedb.org/3"
+# imdb id -> (tmdb id, monotonic time cached). A match never changes; a miss
+# (None) is retried after TMDB_ID_NEGATIVE_TTL, as TMDb may add the movie later
+_TMDB_IDS: "OrderedDict[str, Tuple[int | None, float]]" = OrderedDict()
+_TMDB_IDS_MAX = 10_000
 
 class TMDbUnavailable(Exception):
     pass
@@ -13,27 +22,59 @@ def _require_key() -> str:
         raise TMDbUnavailable("TMDb API key missing or dummy; set TMDB_API_KEY in .env")
     return settings.TMDB_API_KEY
 
-def find_tmdb_id_by_imdb(imdb_id: str) -> int | None:
-    key = _require_key()
+async def _get(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    outcome = "error"
     try:
-        r = requests.get(f"{TMDB_BASE}/find/{imdb_id}", params={"api_key": key, "external_source": "imdb_id"}, timeout=15)
+        r = await get_client().get(f"{TMDB_BASE}{path}", params=params)
         r.raise_for_status()
         data = r.json()
-        results = data.get("movie_results") or []
-        return results[0]["id"] if results else None
-    except requests.exceptions.RequestException as e:
+        outcome = "ok"
+        return data
+    except httpx.HTTPError as e:
         raise TMDbUnavailable(f"TMDb API error: {str(e)}")
-    except (KeyError, IndexError, ValueError) as e:
+    except ValueError as e:
         raise TMDbUnavailable(f"TMDb API returned unexpected data: {str(e)}")
+    finally:
+        metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - t0, service="tmdb", outcome=outcome)
 
-def fetch_reviews_by_tmdb_id(tmdb_id: int, page: int = 1) -> List[Dict[str, Any]]:
+async def find_tmdb_id_by_imdb(imdb_id: str) -> int | None:
     key = _require_key()
+    cached = _TMDB_IDS.get(imdb_id)
+    if cached and (cached[0] is not None or time.monotonic() - cached[1] < settings.TMDB_ID_NEGATIVE_TTL):
+        _TMDB_IDS.move_to_end(imdb_id)
+        return cached[0]
+    data = await _get(f"/find/{imdb_id}", {"api_key": key, "external_source": "imdb_id"})
+    try:
+        results = data.get("movie_results") or []
+        tmdb_id = results[0]["id"] if results else None
+    except (AttributeError, KeyError, IndexError, TypeError) as e:
+        raise TMDbUnavailable(f"TMDb API returned unexpected data: {str(e)}")
+    _TMDB_IDS[imdb_id] = (tmdb_id, time.monotonic())
+    _TMDB_IDS.move_to_end(imdb_id)
+    if len(_TMDB_IDS) > _TMDB_IDS_MAX:
+        _TMDB_IDS.popitem(last=False)
+    return tmdb_id
+
+async def fetch_reviews_by_tmdb_id(tmdb_id: int, page: int = 1) -> List[Dict[str, Any]]:
+    key = _require_key()
+    data = await _get(f"/movie/{tmdb_id}/reviews", {"api_key": key, "page": page})
     try:
-        r = requests.get(f"{TMDB_BASE}/movie/{tmdb_id}/reviews", params={"api_key": key, "page": page}, timeout=15)
-        r.raise_for_status()
-        data = r.json()
         return data.get("results", [])
-    except requests.exceptions.RequestException as e:
-        raise TMDbUnavailable(f"TMDb API error: {str(e)}")
-    except (KeyError, ValueError) as e:
+    except AttributeError as e:
         raise TMDbUnavailable(f"TMDb API returned unexpected data: {str(e)}")
+
+async def fetch_review_pages(tmdb_id: int, max_pages: int) -> List[Dict[str, Any]]:
+    """Fetch review pages 1..max_pages concurrently, returned in page order.
+
+    At most TMDB_MAX_CONCURRENCY requests are in flight at once; pages past
+    the last one come back empty and add nothing.
+    """
+    sem = asyncio.Semaphore(max(1, settings.TMDB_MAX_CONCURRENCY))
+
+    async def one(page: int) -> List[Dict[str, Any]]:
+        async with sem:
+            return await fetch_reviews_by_tmdb_id(tmdb_id, page=page)
+
+    pages = await asyncio.gather(*(one(p) for p in range(1, max_pages + 1)))
+    return [r for results in pages for r in results]
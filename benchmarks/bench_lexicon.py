@@ -0,0 +1,90 @@
+"""Compare the lexicon scorer with the previous substring-scan fallback.
+
+    PYTHONPATH=. python benchmarks/bench_lexicon.py [--n 100000]
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from backend.config import settings
+from backend.lexicon import Lexicon, DEFAULT_LEXICON
+
+SHORT = [
+    "Amazing movie with stunning visuals!", "Great acting and beautiful score.", "Loved it, a must watch.",
+    "Boring and too slow.", "I hate the pacing, overhyped.", "Terrible writing and confusing plot.",
+    "It was okay, nothing special.", "Not bad at all, slowly grew on me.", "Badass action, never boring.",
+]
+
+
+LEGACY_POS = {"good", "great", "love", "amazing", "stunning", "awesome", "breathtaking", "fantastic", "enjoyed"}
+LEGACY_NEG = {"bad", "boring", "slow", "terrible", "awful", "overhyped", "hate", "dull", "disappointing"}
+
+
+def legacy_predict(texts: List[str], pos_words=LEGACY_POS, neg_words=LEGACY_NEG) -> List[Dict[str, Any]]:
+    """The pre-lexicon fallback: substring tests of every word against every text."""
+    out = []
+    for t in texts:
+        tl = t.lower()
+        p = sum(w in tl for w in pos_words)
+        n = sum(w in tl for w in neg_words)
+        if p > n:
+            out.append({"label": "POSITIVE", "score": 0.85})
+        elif n > p:
+            out.append({"label": "NEGATIVE", "score": 0.85})
+        else:
+            out.append({"label": "NEUTRAL", "score": 0.60})
+    return out
+
+
+def corpus(n: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    long_texts = [r.get("text", "") for p in (Path(settings.DATA_DIR) / "reviews").glob("*.json")
+                  for r in json.loads(p.read_text(encoding="utf-8"))]
+    # ~1 in 20 reviews is a long TMDb-style essay
+    return [rng.choice(long_texts) if long_texts and rng.random() < 0.05 else rng.choice(SHORT) for _ in range(n)]
+
+
+def large_lexicon(texts: List[str], size: int, seed: int = 7) -> Dict[str, float]:
+    """Default lexicon padded with corpus words to `size` entries (random polarity)."""
+    rng = random.Random(seed)
+    vocab = sorted({w for t in texts[:5000] for w in t.lower().split() if w.isalpha() and len(w) > 3})
+    extra = [w for w in vocab if w not in DEFAULT_LEXICON][: max(0, size - len(DEFAULT_LEXICON))]
+    return {**DEFAULT_LEXICON, **{w: rng.choice((1.0, -1.0)) for w in extra}}
+
+
+def run(texts: List[str], weights: Dict[str, float]) -> Dict[str, Any]:
+    pos = {w.rstrip("*") for w, v in weights.items() if v > 0}
+    neg = {w.rstrip("*") for w, v in weights.items() if v < 0}
+    lex = Lexicon(weights)
+    results: Dict[str, Any] = {"lexicon_terms": len(weights)}
+    labels = {}
+    for name, fn in (("legacy_substring", lambda ts: legacy_predict(ts, pos, neg)), ("lexicon", lex.score_batch)):
+        t0 = time.perf_counter()
+        labels[name] = [p["label"] for p in fn(texts)]
+        elapsed = time.perf_counter() - t0
+        results[name] = {"seconds": round(elapsed, 4), "texts_per_sec": round(len(texts) / elapsed)}
+    results["labels_changed"] = sum(a != b for a, b in zip(labels["legacy_substring"], labels["lexicon"]))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--large", type=int, default=2000, help="term count of the large-lexicon run")
+    args = parser.parse_args()
+
+    texts = corpus(args.n)
+    report = {
+        "n": len(texts),
+        "default_lexicon": run(texts, DEFAULT_LEXICON),
+        "large_lexicon": run(texts, large_lexicon(texts, args.large)),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
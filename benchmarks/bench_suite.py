@@ -0,0 +1,147 @@
+"""Time the inference, summary, export and persistence hot paths on synthetic corpora.
+
+    PYTHONPATH=. python benchmarks/bench_suite.py [--sizes 1000 10000 100000]
+        [--output benchmarks/results.json] [--baseline benchmarks/baseline.json]
+        [--threshold 0.25] [--save-baseline]
+
+Corpora come from backend.mock_reviews (unique texts, so neither the
+prediction cache nor dedup can shortcut a run), and the in-process read cache
+is cleared before every run. Every case keeps the best of --repeat runs. With a baseline file present, any case more than --threshold
+slower than its baseline makes the script exit with status 1.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from backend.config import settings
+from backend import persistence_json, sentiment_hf
+from backend.mock_reviews import generate
+
+HERE = Path(__file__).resolve().parent
+# Cases faster than this are too noisy to flag as regressions
+MIN_SECONDS = 0.02
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        # cold reads: a warm read cache would turn the load cases into dict copies
+        persistence_json.clear_read_cache()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def drain(response) -> int:
+    """Consume a StreamingResponse body the way the server would."""
+    async def consume() -> int:
+        size = 0
+        async for chunk in response.body_iterator:
+            size += len(chunk)
+        return size
+    return asyncio.run(consume())
+
+
+def run_size(n: int, repeat: int, model_max: int) -> Dict[str, Dict[str, Any]]:
+    from backend import app as api
+
+    reviews = generate(n, rng=random.Random(n), unique=True, spread_days=365)
+    texts = [r["text"] for r in reviews]
+    imdb_id = f"bench{n}"
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def case(name: str, fn: Callable[[], Any], items: int = n) -> None:
+        seconds = best_of(fn, repeat)
+        results[f"{name}@{n}"] = {"seconds": round(seconds, 5), "per_sec": round(items / seconds) if seconds else None}
+
+    case("fallback_predict", lambda: sentiment_hf._fallback_predict(texts))
+    if sentiment_hf._get_pipeline() is not None:
+        if n <= model_max:
+            case("predict_model", lambda: sentiment_hf.predict(texts))
+    else:
+        # no model installed: predict() is the fallback path plus its wrapper
+        case("predict_fallback", lambda: sentiment_hf.predict(texts))
+
+    rows = [
+        {"review_id": str(i), **r, **p}
+        for i, (r, p) in enumerate(zip(reviews, sentiment_hf._fallback_predict(texts)))
+    ]
+    case("save_reviews", lambda: persistence_json.save_reviews(imdb_id, reviews))
+    case("load_reviews", lambda: persistence_json.load_reviews(imdb_id))
+    case("save_analysis", lambda: persistence_json.save_analysis(imdb_id, rows))
+    case("load_analysis", lambda: persistence_json.load_analysis(imdb_id))
+    case("summary", lambda: api.summary(imdb_id))
+    case("export_csv", lambda: drain(api.export_csv(imdb_id)))
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Cases slower than baseline * (1 + threshold), as printable lines."""
+    slower = []
+    for name, res in sorted(results.items()):
+        base = baseline.get(name)
+        if not base or base["seconds"] < MIN_SECONDS:
+            continue
+        ratio = res["seconds"] / base["seconds"]
+        if ratio > 1 + threshold:
+            slower.append(f"{name}: {res['seconds']:.4f}s vs baseline {base['seconds']:.4f}s (x{ratio:.2f})")
+    return slower
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--model-max", type=int, default=10_000, help="largest corpus timed on the real model")
+    parser.add_argument("--output", type=Path, default=HERE / "results.json")
+    parser.add_argument("--baseline", type=Path, default=HERE / "baseline.json")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    args = parser.parse_args()
+
+    # Isolated data dir, and no prediction cache: every run measures real work
+    settings.PREDICTION_CACHE_ENABLED = False
+    with tempfile.TemporaryDirectory() as tmp:
+        persistence_json.BASE = Path(tmp)
+        settings.SQLITE_PATH = str(Path(tmp) / "bench.sqlite3")
+        results: Dict[str, Dict[str, Any]] = {}
+        for n in args.sizes:
+            results.update(run_size(n, args.repeat, args.model_max))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "storage": settings.STORAGE_BACKEND,
+            "engine": sentiment_hf._engine if sentiment_hf._pipeline is not None else "lexicon",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    slower = compare(results, json.loads(args.baseline.read_text(encoding="utf-8"))["results"], args.threshold)
+    if slower:
+        print("Regressions past the threshold:\n  " + "\n  ".join(slower), file=sys.stderr)
+        sys.exit(1)
+    print(f"no regressions beyond {args.threshold:.0%} of baseline")
+
+
+if __name__ == "__main__":
+    main()
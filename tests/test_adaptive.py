@@ -0,0 +1,28 @@
+from fastapi.testclient import TestClient
+
+from backend.app import app
+
+client = TestClient(app)
+
+
+def test_adaptive_router_degrades_under_load_and_recovers(monkeypatch):
+    from backend import adaptive
+
+    now = [0.0]
+    router = adaptive.AdaptiveRouter(slo_ms=100, max_queue=2, window_s=10, clock=lambda: now[0])
+    assert router.route("low") is None
+    with router.track():
+        now[0] += 0.5  # a model call far over the SLO
+    assert router.route("low") == "latency" and router.route("high") is None
+    with router.track(), router.track():
+        assert router.route("high") == "overflow"
+
+    monkeypatch.setattr(adaptive, "router", router)
+    preview = client.post('/api/analyze-text', json={'text': 'Great movie!'}).json()
+    assert preview["engine"] == "lexicon" and preview["degraded"] == "latency"
+    urgent = client.post('/api/analyze-text', json={'text': 'Great movie!', 'priority': 'high'}).json()
+    assert urgent["degraded"] is None and urgent["label"] == preview["label"]
+    assert client.post('/api/analyze-text', json={'text': 'x', 'priority': 'urgent'}).status_code == 400
+
+    now[0] += 11  # slow samples age out of the window: back to the model
+    assert client.post('/api/analyze-text', json={'text': 'Great movie!'}).json()["degraded"] is None
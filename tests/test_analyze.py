@@ -11,3 +11,152 @@ def test_fallback_or_model():
     assert len(out) == 3
     labels = {o['label'] for o in out}
     assert labels  # non-empty
+
+
+def test_incremental_analysis_scores_only_delta(monkeypatch):
+    from backend import analysis
+
+    seen = []
+
+    def fake_predict(texts):
+        seen.extend(texts)
+        return [{"label": "POSITIVE", "score": 0.9} for _ in texts]
+
+    monkeypatch.setattr(analysis, "hf_predict", fake_predict)
+    reviews = [{"text": "Great!", "source": "user", "timestamp": "t1"}]
+    rows, stats = analysis.analyze_reviews(reviews)
+    assert stats == {"scored": 1, "reused": 0}
+
+    reviews.append({"text": "Dull.", "source": "user", "timestamp": "t2"})
+    rows, stats = analysis.analyze_reviews(reviews, previous=rows)
+    assert stats == {"scored": 1, "reused": 1}
+    assert seen == ["Great!", "Dull."]
+    assert [r["text"] for r in rows] == ["Great!", "Dull."]
+
+
+def test_length_buckets_respect_budget_and_keep_order():
+    from backend import sentiment_hf
+
+    lengths = [100, 3, 50, 4, 100, 5]
+    buckets = sentiment_hf._make_buckets(lengths, token_budget=200, max_batch=2)
+    assert sorted(i for b in buckets for i in b) == list(range(len(lengths)))
+    for b in buckets:
+        assert len(b) <= 2 and len(b) * max(lengths[i] for i in b) <= 200
+
+    def fake_pipe(texts, batch_size=None):
+        return [{"label": "positive" if "good" in t else "negative", "score": 0.5} for t in texts]
+
+    texts = ["good " * 40, "bad", "good", "bad " * 30]
+    out = sentiment_hf._run_pipeline(fake_pipe, texts)
+    assert [o["label"] for o in out] == ["POSITIVE", "NEGATIVE", "POSITIVE", "NEGATIVE"]
+
+
+def test_pool_worker_without_model_falls_back_uncached(monkeypatch):
+    from backend import inference_pool, sentiment_hf
+    from backend.config import settings
+    from backend.prediction_cache import PredictionCache, text_key
+
+    monkeypatch.setattr(settings, "HF_POOL_WORKERS", 2)
+    monkeypatch.setattr(settings, "HF_POOL_SHARD_SIZE", 2)
+    monkeypatch.setattr(settings, "HF_POOL_MIN_TEXTS", 4)
+    # the parent has a model, the spawned workers (LIGHTWEIGHT_MODE) do not
+    monkeypatch.setenv("LIGHTWEIGHT_MODE", "1")
+    monkeypatch.setattr(sentiment_hf, "_get_pipeline", lambda: object())
+    cache = PredictionCache(None)
+    monkeypatch.setattr(sentiment_hf, "get_cache", lambda: cache)
+    texts = ["great", "awful", "fine", "boring", "amazing"]
+    assert inference_pool.enabled_for(len(texts))
+    try:
+        out, engine = sentiment_hf.predict_with_engine(texts)
+    finally:
+        inference_pool.shutdown()
+    assert engine == "lexicon"
+    assert [o["label"] for o in out] == ["POSITIVE", "NEGATIVE", "NEUTRAL", "NEGATIVE", "POSITIVE"]
+    assert cache.lookup(sentiment_hf._model_key(), [text_key(t) for t in texts]) == [None] * 5
+
+
+def test_prediction_cache_errors_fall_through_to_the_model(monkeypatch):
+    import sqlite3
+    from backend import sentiment_hf
+
+    class LockedCache:
+        def lookup(self, model, keys):
+            raise sqlite3.OperationalError("database is locked")
+
+        store = lookup
+
+    monkeypatch.setattr(sentiment_hf, "_get_pipeline", lambda: object())
+    monkeypatch.setattr(sentiment_hf, "get_cache", lambda: LockedCache())
+    monkeypatch.setattr(sentiment_hf, "_run_pipeline", lambda pipe, texts: [{"label": "POSITIVE", "score": 0.9}] * len(texts))
+    out, engine = sentiment_hf.predict_with_engine(["great", "fine"])
+    assert engine == sentiment_hf._engine and [o["label"] for o in out] == ["POSITIVE", "POSITIVE"]
+
+
+def test_summary_aggregate_matches_full_scan():
+    import random
+    from backend.summary import SummaryAggregate
+
+    rng = random.Random(3)
+    rows = [{"text": f"r{i}", "label": rng.choice(["POSITIVE", "NEGATIVE", "NEUTRAL"]),
+             "score": rng.choice([0.5, 0.75, 0.9, 0.99])} for i in range(200)]
+
+    def top(prefix):
+        picked = [r for r in rows if r["label"].startswith(prefix)]
+        return [r["text"] for r in sorted(picked, key=lambda x: x.get("score", 0), reverse=True)[:5]]
+
+    agg = SummaryAggregate.from_dict(SummaryAggregate.from_rows(rows[:120]).to_dict())
+    agg.extend(rows[120:])
+    out = agg.response("tt0000004")
+    assert out["total"] == 200
+    assert out["avg_confidence"] == round(sum(r["score"] for r in rows) / 200, 4)
+    assert out["top_positive_quotes"] == top("POS")
+    assert out["top_negative_quotes"] == top("NEG")
+
+
+def test_bulk_analysis_pools_movies_into_one_predict_call(tmp_path, monkeypatch):
+    from backend import analysis, persistence_json
+    from backend.bulk import analyze_movies
+
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    persistence_json.save_reviews("tt1", [{"text": "Great"}, {"text": "Awful"}])
+    persistence_json.save_reviews("tt2", [{"text": "Boring"}])
+    calls = []
+    real = analysis.hf_predict
+    monkeypatch.setattr(analysis, "hf_predict", lambda texts: calls.append(list(texts)) or real(texts))
+
+    out = analyze_movies(["tt1", "tt2", "tt3"])
+    assert calls == [["Great", "Awful", "Boring"]]
+    by_id = {m["imdb_id"]: m for m in out["movies"]}
+    assert by_id["tt1"]["scored"] == 2 and by_id["tt2"]["scored"] == 1
+    assert by_id["tt3"]["ok"] is False
+    assert out["total"]["reviews"] == 3 and "reviews_per_sec" in out["total"]
+    assert [r["label"] for r in persistence_json.load_analysis("tt1")] == ["POSITIVE", "NEGATIVE"]
+    assert [r["label"] for r in persistence_json.load_analysis("tt2")] == ["NEGATIVE"]
+
+
+def test_trend_rollups_follow_saves_and_appends(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from backend import persistence_json
+    from backend.app import app
+
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    row = {"text": "t", "label": "POSITIVE", "score": 0.5}
+    persistence_json.save_analysis("tt5", [
+        dict(row, source="tmdb:ann", timestamp="2024-04-30T23:30:00-02:00"),  # 2024-05-01 UTC
+        dict(row, source="user", timestamp="2024-05-01T10:00:00Z", label="NEGATIVE", score=1.0),
+        dict(row, source="user", timestamp=None),
+    ])
+    persistence_json.append_analysis("tt5", [dict(row, source="tmdb:bob", timestamp="2024-06-03T08:00:00.5Z")])
+
+    client = TestClient(app)
+    day = client.get("/api/trend/tt5").json()
+    assert [(p["period"], p["positives"], p["negatives"], p["avg_score"]) for p in day["points"]] == [
+        ("2024-05-01", 1, 1, 0.75), ("2024-06-03", 1, 0, 0.5)]
+    assert day["undated"] == 1
+    month = client.get("/api/trend/tt5", params={"interval": "month", "source": "tmdb:*"}).json()
+    assert [(p["period"], p["total"]) for p in month["points"]] == [("2024-05", 1), ("2024-06", 1)]
+    assert month["sources"] == ["tmdb"] and month["undated"] == 0
+    assert client.get("/api/trend/tt5").json()["sources"] == ["tmdb", "user"]
+    assert client.get("/api/trend/tt5", params={"interval": "week"}).json()["points"][0]["period"] == "2024-W18"
+    assert client.get("/api/trend/tt5", params={"interval": "year"}).status_code == 400
+    assert client.get("/api/trend/tt404").status_code == 404
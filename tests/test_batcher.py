@@ -0,0 +1,17 @@
+def test_micro_batcher_coalesces_concurrent_calls():
+    import asyncio
+    from backend.batching import MicroBatcher
+
+    batches = []
+
+    def fn(items):
+        batches.append(list(items))
+        return [i * 2 for i in items]
+
+    batcher = MicroBatcher(fn, max_batch=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert asyncio.run(run()) == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
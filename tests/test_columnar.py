@@ -0,0 +1,84 @@
+import os
+
+from backend import columnar, persistence_json
+from backend.summary import SummaryAggregate
+
+
+ROWS = [
+    {"review_id": "a", "text": "Great film", "source": "tmdb:ann", "timestamp": "2024-01-01", "label": "POSITIVE", "score": 0.85},
+    {"review_id": "b", "text": "ÉPICO, ¡sí! 🎬", "source": None, "timestamp": None, "label": "NEGATIVE", "score": 0.6},
+    {"text": "", "source": "user", "timestamp": 1700000000, "label": "NEUTRAL", "score": 0.9998123, "note": {"x": 1}},
+]
+
+
+def test_round_trip_and_append(tmp_path):
+    path = tmp_path / "m.cols"
+    columnar.write(path, ROWS[:2])
+    columnar.append(path, ROWS[2:])
+    cols = columnar.Columns(path)
+    assert len(cols) == 3
+    assert list(cols.iter_rows()) == ROWS
+    assert list(cols.iter_rows(2)) == ROWS[2:]
+    assert cols.label_names == ["POSITIVE", "NEGATIVE", "NEUTRAL"]
+
+    # bytes from an append that never committed meta.json are discarded
+    with open(path / "text.bin", "ab") as f:
+        f.write(b"torn write")
+    columnar.append(path, ROWS[:1])
+    assert list(columnar.Columns(path).iter_rows()) == ROWS + ROWS[:1]
+
+
+def test_analysis_is_columnar_and_load_analysis_compatible(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    rows = [dict(r, label=lab, score=sc) for r, (lab, sc) in zip(
+        ROWS * 4, [("POSITIVE", 0.9), ("NEGATIVE", 0.7), ("POSITIVE", 0.9), ("NEUTRAL", 0.6)] * 3)]
+    persistence_json.save_analysis("tt0000008", rows[:5])
+    persistence_json.append_analysis("tt0000008", rows[5:])
+    assert os.path.isdir(persistence_json.analysis_columns_path("tt0000008"))
+    assert not persistence_json.analysis_path("tt0000008").exists()
+    assert persistence_json.load_analysis("tt0000008") == rows
+
+    expected = SummaryAggregate.from_rows(rows).response("tt0000008")
+    assert persistence_json.summarize_analysis("tt0000008").response("tt0000008") == expected
+    assert persistence_json.load_summary("tt0000008").response("tt0000008") == expected
+
+
+
+def test_concurrent_saves_and_appends_keep_the_store_whole(tmp_path, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+
+    def run(target, n):
+        threads = [threading.Thread(target=target) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    run(lambda: persistence_json.save_analysis("tt1", ROWS), 4)
+    assert persistence_json.load_analysis("tt1") == ROWS
+
+    def appender():
+        for _ in range(10):
+            persistence_json.append_analysis("tt1", ROWS[:1])
+
+    run(appender, 4)
+    assert len(persistence_json.load_analysis("tt1")) == 3 + 40
+    assert persistence_json.load_summary("tt1").total == 43
+    # lock files live under cache/locks, not next to the data
+    assert [p.name for p in (tmp_path / "analysis").iterdir()] == ["tt1_sentiment.cols"]
+
+    # a store swapped in after a reader read meta.json, before it mapped the files
+    persistence_json.save_analysis("tt1", ROWS)
+    newer = [dict(r, text=r["text"] + " (edited)") for r in ROWS[::-1] * 2]
+    read_meta = columnar._read_meta
+
+    def racing_read_meta(path):
+        meta = read_meta(path)
+        monkeypatch.setattr(columnar, "_read_meta", read_meta)
+        persistence_json.save_analysis("tt1", newer)
+        return meta
+
+    monkeypatch.setattr(columnar, "_read_meta", racing_read_meta)
+    assert list(persistence_json.load_analysis_columns("tt1").iter_rows()) == newer
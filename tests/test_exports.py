@@ -0,0 +1,135 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from backend import persistence_json
+from backend.app import app
+
+ROWS = [
+    {"review_id": str(i), "text": f"review {i}", "source": "mock", "timestamp": None,
+     "label": "POSITIVE" if i % 3 else "NEGATIVE", "score": i / 10}
+    for i in range(10)
+]
+
+
+def test_paginated_and_streamed_analysis(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    persistence_json.save_analysis("tt0000005", ROWS)
+    client = TestClient(app)
+
+    assert client.get("/api/analysis/tt0000005").json() == {"imdb_id": "tt0000005", "rows": ROWS}
+
+    seen, cursor = [], 0
+    while cursor is not None:
+        body = client.get("/api/analysis/tt0000005", params={"cursor": cursor, "limit": 2, "label": "positive",
+                                                             "min_score": 0.2}).json()
+        seen += [r["review_id"] for r in body["rows"]]
+        cursor = body["next_cursor"]
+    assert seen == ["2", "4", "5", "7", "8"]
+    assert client.get("/api/analysis/tt0000005", params={"cursor": 50, "limit": 2}).json()["rows"] == []
+    assert client.get("/api/analysis/tt0000006", params={"cursor": 4, "limit": 2}).status_code == 404
+
+    csv_lines = client.get("/api/export/tt0000005.csv").text.splitlines()
+    assert csv_lines[0] == "text,source,timestamp,label,score" and len(csv_lines) == 11
+    nd = client.get("/api/export/tt0000005.ndjson").text.splitlines()
+    assert [json.loads(line) for line in nd] == ROWS
+    assert client.get("/api/export/tt0000006.csv").status_code == 404
+
+
+def test_keyword_search_ranks_filters_and_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    row = {"source": "mock", "timestamp": None, "label": "POSITIVE", "score": 0.9}
+    persistence_json.save_analysis("tt0000007", [
+        dict(row, review_id="a", text="The pacing was slow, slow pacing all the way."),
+        dict(row, review_id="b", text="Great score and great pacing."),
+        dict(row, review_id="c", text="Nothing about the music."),
+        dict(row, review_id="d", text="Pacing issues everywhere", label="NEGATIVE", score=0.6),
+    ])
+    persistence_json.append_analysis("tt0000007", [dict(row, review_id="e", text="The score was pacing-perfect")])
+    client = TestClient(app)
+
+    body = client.get("/api/search/tt0000007", params={"q": "pacing"}).json()
+    assert [h["review_id"] for h in body["hits"]] == ["a", "d", "e", "b"] and body["total"] == 4
+    both = client.get("/api/search/tt0000007", params={"q": "score pacing"}).json()
+    assert [h["review_id"] for h in both["hits"]][:2] == ["e", "b"]
+
+    seen, cursor = [], 0
+    while cursor is not None:
+        page = client.get("/api/search/tt0000007", params={"q": "pacing", "label": "positive", "min_score": 0.7,
+                                                           "cursor": cursor, "limit": 2}).json()
+        seen += [h["review_id"] for h in page["hits"]]
+        cursor = page["next_cursor"]
+    assert seen == ["a", "e", "b"]
+    assert client.get("/api/search/tt0000007", params={"q": "the"}).status_code == 400
+    assert client.get("/api/search/tt0000008", params={"q": "pacing"}).status_code == 404
+
+
+def test_sqlite_search_reuses_the_loaded_index(tmp_path, monkeypatch):
+    from backend import persistence_sqlite
+    from backend.config import settings
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "SQLITE_PATH", str(tmp_path / "store.sqlite3"))
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    persistence_json.save_analysis("tt0000010", ROWS)
+    client = TestClient(app)
+    search = lambda: [h["review_id"] for h in client.get("/api/search/tt0000010", params={"q": "review"}).json()["hits"]]
+    assert search() == [r["review_id"] for r in ROWS]
+
+    loads = []
+    for name in ("load_artifact", "load_artifact_log", "load_analysis", "analysis_ids"):
+        real = getattr(persistence_sqlite, name)
+        monkeypatch.setattr(persistence_sqlite, name, lambda *a, _real=real, _name=name: loads.append(_name) or _real(*a))
+    assert search() == [r["review_id"] for r in ROWS]
+    assert loads == []
+
+    # an append changes both versions: the new row is found
+    persistence_json.append_analysis("tt0000010", [dict(ROWS[0], review_id="new", text="new review")])
+    assert search()[-1] == "new"
+
+
+def test_appends_go_to_the_search_log_until_it_is_merged(tmp_path, monkeypatch):
+    from backend.config import settings
+    from backend.search_index import SearchIndex, search_parts
+
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    monkeypatch.setattr(settings, "SEARCH_LOG_MAX_ROWS", 4)
+    words = ["slow pacing", "great score", "pacing and score", "music", "slow score"]
+    rows = [dict(ROWS[0], review_id=str(i), text=f"{words[i % 5]} {i}") for i in range(12)]
+    persistence_json.save_analysis("tt0000009", rows[:3])
+    log = persistence_json.artifact_log_path("search", "tt0000009")
+
+    for i in range(3, 7):
+        persistence_json.append_analysis("tt0000009", rows[i:i + 1])
+    assert len(persistence_json.load_search_index("tt0000009")) == 5 and log.exists()
+    expected = SearchIndex.from_rows(rows[:7]).search("slow score")
+    assert search_parts(persistence_json.load_search_index("tt0000009"), "slow score") == expected
+
+    persistence_json.append_analysis("tt0000009", rows[7:12])  # past the limit: merged
+    assert len(persistence_json.load_search_index("tt0000009")) == 1 and not log.exists()
+    assert persistence_json.load_search_index("tt0000009")[0].to_dict() == SearchIndex.from_rows(rows).to_dict()
+
+
+def test_sqlite_export_streams_across_threads(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from backend import persistence_sqlite
+    from backend.config import settings
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "SQLITE_PATH", str(tmp_path / "store.sqlite3"))
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    monkeypatch.setattr(persistence_sqlite, "_PAGE_ROWS", 3)
+    persistence_json.save_analysis("tt0000008", ROWS)
+
+    # started on this thread, consumed on others, like a StreamingResponse
+    rows = persistence_json.iter_analysis("tt0000008", start=2)
+    assert next(rows) == ROWS[2]
+    with ThreadPoolExecutor(1) as pool:
+        assert pool.submit(list, rows).result() == ROWS[3:]
+
+    client = TestClient(app)
+    with ThreadPoolExecutor(4) as pool:
+        bodies = list(pool.map(lambda _: client.get("/api/export/tt0000008.ndjson"), range(4)))
+    assert all(r.status_code == 200 and [json.loads(line) for line in r.text.splitlines()] == ROWS for r in bodies)
+    page = client.get("/api/analysis/tt0000008", params={"cursor": 4, "limit": 3}).json()
+    assert [r["review_id"] for r in page["rows"]] == ["4", "5", "6"]
@@ -15,3 +15,93 @@ def test_analyze_text():
     assert r.status_code == 200
     data = r.json()
     assert 'label' in data and 'score' in data
+
+
+def test_tmdb_import_fetches_pages_concurrently(tmp_path, monkeypatch):
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+    from backend import persistence_json, tmdb_client
+    from backend.config import settings
+
+    calls = {"find": 0}
+
+    class Stub(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.startswith("/find/"):
+                calls["find"] += 1
+                body = {"movie_results": [{"id": 42}]}
+            else:
+                page = int(parse_qs(url.query)["page"][0])
+                time.sleep(0.2)
+                body = {"results": [{"content": f"page {page}", "author": "a", "created_at": None}]}
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 64
+
+    server = Server(("127.0.0.1", 0), Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.setattr(tmdb_client, "TMDB_BASE", f"http://127.0.0.1:{server.server_port}")
+        monkeypatch.setattr(settings, "TMDB_API_KEY", "test")
+        monkeypatch.setattr(settings, "TMDB_MAX_CONCURRENCY", 10)
+        monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+        tmdb_client._TMDB_IDS.clear()
+
+        started = time.perf_counter()
+        r = client.post("/api/reviews/tt0000001/import/tmdb?max_pages=10")
+        elapsed = time.perf_counter() - started
+        assert r.status_code == 200
+        assert r.json()["count"] == 10
+        # ten 0.2s pages in flight together, not back to back
+        assert elapsed < 1.0
+        texts = [row["text"] for row in persistence_json.load_reviews("tt0000001")]
+        assert texts == [f"page {p}" for p in range(1, 11)]
+
+        client.post("/api/reviews/tt0000001/import/tmdb?max_pages=1")
+        assert calls["find"] == 1
+    finally:
+        server.shutdown()
+        tmdb_client._TMDB_IDS.clear()
+
+
+def test_tmdb_id_misses_expire(monkeypatch):
+    import asyncio
+    from backend import tmdb_client
+    from backend.config import settings
+
+    answers = {"tt1": [], "tt2": [{"id": 7}]}
+    calls = []
+
+    async def fake_get(path, params):
+        imdb_id = path.rsplit("/", 1)[1]
+        calls.append(imdb_id)
+        return {"movie_results": answers[imdb_id]}
+
+    monkeypatch.setattr(tmdb_client, "_get", fake_get)
+    monkeypatch.setattr(tmdb_client, "_TMDB_IDS", type(tmdb_client._TMDB_IDS)())
+    monkeypatch.setattr(settings, "TMDB_API_KEY", "test")
+    monkeypatch.setattr(settings, "TMDB_ID_NEGATIVE_TTL", 300)
+    find = lambda imdb_id: asyncio.run(tmdb_client.find_tmdb_id_by_imdb(imdb_id))
+
+    assert (find("tt1"), find("tt2")) == (None, 7)
+    assert (find("tt1"), find("tt2")) == (None, 7)
+    assert calls == ["tt1", "tt2"]
+    # five minutes on, TMDb has added the movie: the miss is asked again, the match is not
+    for imdb_id, (tmdb_id, cached_at) in list(tmdb_client._TMDB_IDS.items()):
+        tmdb_client._TMDB_IDS[imdb_id] = (tmdb_id, cached_at - 301)
+    answers["tt1"] = [{"id": 5}]
+    assert (find("tt1"), find("tt2")) == (5, 7)
+    assert calls == ["tt1", "tt2", "tt1"]
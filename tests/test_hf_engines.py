@@ -0,0 +1,45 @@
+import pytest
+
+from backend import hf_engines, sentiment_hf
+from backend.config import settings
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError, match="Unknown HF_ENGINE 'tensorrt'"):
+        hf_engines.load_engine("tensorrt", "some-model")
+
+
+def _fresh_pipeline(monkeypatch, engine, loader):
+    monkeypatch.delenv("LIGHTWEIGHT_MODE", raising=False)
+    monkeypatch.setattr(settings, "HF_ENGINE", engine)
+    monkeypatch.setattr(sentiment_hf, "_pipeline", None)
+    monkeypatch.setattr(sentiment_hf, "_engine", engine)
+    monkeypatch.setattr(sentiment_hf, "load_engine", loader)
+
+
+def test_pipeline_falls_back_to_torch_when_engine_fails(monkeypatch):
+    tried = []
+    torch_pipe = object()
+
+    def loader(engine, model_name):
+        tried.append(engine)
+        if engine == "onnx":
+            raise ImportError("no optimum")
+        return torch_pipe
+
+    _fresh_pipeline(monkeypatch, "onnx", loader)
+    assert sentiment_hf._get_pipeline() is torch_pipe
+    assert tried == ["onnx", "torch"] and sentiment_hf._engine == "torch"
+    assert sentiment_hf._model_key() == sentiment_hf._model_name()
+
+
+def test_pipeline_is_none_when_no_engine_loads(monkeypatch):
+    tried = []
+
+    def loader(engine, model_name):
+        tried.append(engine)
+        raise OSError("model unavailable")
+
+    _fresh_pipeline(monkeypatch, "torch-int8", loader)
+    assert sentiment_hf._get_pipeline() is None
+    assert tried == ["torch-int8", "torch"]
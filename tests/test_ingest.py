@@ -0,0 +1,94 @@
+import io
+import json
+
+from fastapi.testclient import TestClient
+
+from backend import ingest, persistence_json
+from backend.app import app
+
+
+def rows(data: bytes, name: str):
+    return list(ingest.iter_upload_rows(io.BytesIO(data), name))
+
+
+def test_streaming_parsers_across_chunk_boundaries(monkeypatch):
+    monkeypatch.setattr(ingest, "CHUNK_SIZE", 7)
+    reviews = [{"text": f"review {i} with \"quotes\", commas", "source": "s", "timestamp": None} for i in range(50)]
+    reviews.append({"text": "", "source": "empty", "timestamp": None})
+
+    as_array = json.dumps(reviews, indent=2).encode()
+    as_lines = "\n".join(json.dumps(r) for r in reviews).encode()
+    assert rows(as_array, "dump.json") == reviews[:-1]
+    assert rows(as_lines, "dump.jsonl") == reviews[:-1]
+    assert rows(as_lines, "dump.json") == reviews[:-1]  # sniffed as JSON Lines
+    assert rows(b'text,source\n"multi\nline",x\n', "dump.csv") == [{"text": "multi\nline", "source": "x", "timestamp": None}]
+
+
+def test_upload_replaces_reviews_only_when_valid(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    client = TestClient(app)
+    url = "/api/reviews/tt0000003/upload"
+
+    r = client.post(url, files={"file": ("r.json", b'[{"text": "Great!"}, {"text": "Dull."}]')})
+    assert r.json() == {"ok": True, "count": 2, "skipped": 0}
+    r = client.post(url, files={"file": ("r.json", b'[{"text": "Great!"}, oops]')})
+    assert r.status_code == 400
+    assert len(persistence_json.load_reviews("tt0000003")) == 2
+    # the failed upload's dedup index was discarded, the first one kept
+    assert [p.name for p in (tmp_path / "dedup").iterdir()] == ["tt0000003.sqlite3"]
+
+
+def test_repeated_imports_are_idempotent(tmp_path, monkeypatch):
+    from backend import dedup
+
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    rows = [
+        {"text": "Great film", "source": "tmdb:ann", "timestamp": "2024-01-01T10:00:00.000Z"},
+        {"text": "Dull", "source": "tmdb:bob", "timestamp": "2024-01-02T10:00:00.000Z"},
+    ]
+    assert dedup.append_unique("tt0000007", rows)[1:] == (0, 2)
+    # same rows again, one edited by its author, one with only case/spacing changed
+    again = [dict(rows[0], text="Great film, edited"), {"text": "  great   FILM ", "source": "user", "timestamp": None}]
+    added, skipped, total = dedup.append_unique("tt0000007", rows + again)
+    assert (added, skipped, total) == ([], 4, 2)
+
+    # replacing the reviews drops the index; it is rebuilt from what is stored
+    persistence_json.save_reviews("tt0000007", [{"text": "Fresh"}])
+    added, skipped, total = dedup.append_unique("tt0000007", rows + [{"text": "fresh"}])
+    assert (len(added), skipped, total) == (2, 1, 3)
+
+    client = TestClient(app)
+    r = client.post("/api/reviews/tt0000007/add", json={"text": "Great film"})
+    assert r.json()["skipped"] == 1 and r.json()["added"] is None
+
+
+def test_minhash_flags_near_duplicates(tmp_path, monkeypatch):
+    from backend import dedup
+    from backend.config import settings
+
+    monkeypatch.setattr(settings, "DEDUP_MINHASH_THRESHOLD", 0.6)
+    base = "the plot moves slowly but the acting is superb and the score by the orchestra lifts every single scene"
+    index = dedup.DedupIndex(tmp_path / "index.sqlite3", use_minhash=True)
+    assert index.add({"text": base})
+    assert not index.add({"text": base + " truly"})
+    assert index.add({"text": "a completely different review about dull pacing and a weak ending overall"})
+    index.commit()
+    index.close()
+    restored = dedup.DedupIndex(tmp_path / "index.sqlite3")
+    assert restored.use_minhash and restored.size == 2
+    assert not restored.add({"text": base + " indeed"})
+    restored.close()
+
+
+def test_generate_reviews_uses_shared_templates(tmp_path, monkeypatch):
+    import random
+    from backend import mock_reviews, persistence_json
+
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    r = TestClient(app).post('/api/reviews/tt0000005/generate?count=10')
+    assert r.json()['count'] == 10
+    templates = mock_reviews.POS_TEMPLATES + mock_reviews.NEG_TEMPLATES + mock_reviews.NEU_TEMPLATES
+    assert all(row['text'] in templates for row in persistence_json.load_reviews('tt0000005'))
+
+    rows = mock_reviews.generate(1000, rng=random.Random(1), unique=True, spread_days=30)
+    assert len({row['text'] for row in rows}) == 1000
@@ -0,0 +1,128 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from backend import jobs, persistence_json
+from backend.app import app
+from backend.config import settings
+
+client = TestClient(app)
+
+
+def _wait(job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        state = client.get(f"/api/jobs/{job_id}").json()
+        if state["status"] not in jobs.ACTIVE:
+            return state
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_background_job_reports_progress_and_saves(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    monkeypatch.setattr(settings, "JOBS_CHUNK_SIZE", 2)
+    reviews = [{"text": t} for t in ["Great film", "Boring plot", "Loved it", "Awful", "Fine"]]
+    persistence_json.save_reviews("tt0000003", reviews)
+
+    job = client.post("/api/analyze/tt0000003?background=true").json()
+    state = _wait(job["job_id"])
+    assert state["status"] == "done"
+    assert (state["scored"], state["to_score"], state["total"]) == (5, 5, 5)
+    assert [r["text"] for r in persistence_json.load_analysis("tt0000003")] == [r["text"] for r in reviews]
+
+    # the scored chunks are only streamed while the job runs; afterwards the
+    # log is just the final state
+    body = client.get(f"/api/jobs/{job['job_id']}/events").text
+    assert "event: rows" not in body
+    assert body.count("event: progress") == 1 and '"status": "done"' in body
+
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+
+def test_unfinished_jobs_resume(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    persistence_json.save_reviews("tt0000004", [{"text": "Great"}])
+    persistence_json.save_artifact(jobs.KIND, "restarted", {
+        "job_id": "restarted", "imdb_id": "tt0000004", "full": False, "status": "running",
+        "total": 1, "to_score": 1, "scored": 0, "error": None, "created_at": 0, "updated_at": 0,
+    })
+    assert jobs.resume_pending() == 1
+    state = _wait("restarted")
+    assert state["status"] == "done" and state["resumed"] is True
+    assert persistence_json.load_analysis("tt0000004")[0]["label"] == "POSITIVE"
+
+
+def test_finished_job_compacts_its_events():
+    job = jobs.Job({"job_id": "compact", "status": "running"})
+    job.emit("rows", [{"text": "a"}])
+    job.emit("rows", [{"text": "b"}])
+    assert [seq for seq, _, _ in job.events_after(1)] == [2]
+    job.update(status="done")
+    assert [(seq, event) for seq, event, _ in job.events_after(0)] == [(3, "progress")]
+    assert [seq for seq, _, _ in job.events_after(2)] == [3]
+    assert job.events_after(3) == []
+
+
+def test_evicted_jobs_lose_their_artifacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    monkeypatch.setattr(jobs, "_KEEP_FINISHED", 1)
+    monkeypatch.setattr(jobs, "_jobs", {})
+    persistence_json.save_reviews("tt0000005", [{"text": "Great"}])
+    ids = []
+    for _ in range(3):
+        ids.append(client.post("/api/analyze/tt0000005?background=true&full=true").json()["job_id"])
+        _wait(ids[-1])
+    # registering the third job evicted the first
+    assert persistence_json.load_artifact(jobs.KIND, ids[0]) is None
+    assert all(persistence_json.load_artifact(jobs.KIND, i) for i in ids[1:])
+
+    # finished jobs left by an earlier process are pruned on resume
+    persistence_json.save_artifact(jobs.KIND, "old", {"job_id": "old", "status": "done", "updated_at": 0})
+    monkeypatch.setattr(jobs, "_jobs", {})
+    assert jobs.resume_pending() == 0
+    assert persistence_json.list_artifacts(jobs.KIND) == [ids[2]]
+
+
+def test_active_jobs_are_reused_only_for_the_same_mode(monkeypatch):
+    class Held:
+        def submit(self, fn, job):
+            pass  # the jobs stay queued
+
+    monkeypatch.setattr(jobs, "_jobs", {})
+    monkeypatch.setattr(jobs, "_get_executor", lambda: Held())
+    monkeypatch.setattr(jobs, "save_artifact", lambda *a: None)
+    incremental = jobs.submit("tt0000006")
+    assert jobs.submit("tt0000006")["job_id"] == incremental["job_id"]
+    full = jobs.submit("tt0000006", full=True)
+    assert full["job_id"] != incremental["job_id"] and full["full"] is True
+    assert jobs.submit("tt0000006", full=True)["job_id"] == full["job_id"]
+
+
+def test_analyses_from_the_same_previous_append_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    rows = [{"review_id": str(i), "text": f"r{i}", "source": None, "timestamp": None, "label": "POSITIVE", "score": 0.9}
+            for i in range(3)]
+    persistence_json.save_analysis("tt0000007", rows[:2])
+    # a background job and a synchronous analyze both scored rows[2] against rows[:2]
+    persistence_json.update_analysis("tt0000007", rows)
+    persistence_json.update_analysis("tt0000007", rows)
+    assert persistence_json.load_analysis("tt0000007") == rows
+    assert persistence_json.load_summary("tt0000007").total == 3
+
+
+def test_only_the_first_start_of_worker_0_resumes(tmp_path, monkeypatch):
+    class Held:
+        def submit(self, fn, job):
+            pass
+
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    monkeypatch.setattr(jobs, "_jobs", {})
+    monkeypatch.setattr(jobs, "_get_executor", lambda: Held())
+    persistence_json.save_artifact(jobs.KIND, "running", {"job_id": "running", "status": "running"})
+    # a restarted worker 0 runs next to workers still running that job
+    monkeypatch.setenv("MSA_WORKER", "0")
+    monkeypatch.setenv("MSA_RESUME_JOBS", "0")
+    assert jobs.resume_pending() == 0
+    monkeypatch.setenv("MSA_RESUME_JOBS", "1")
+    assert jobs.resume_pending() == 1
@@ -0,0 +1,36 @@
+from backend.lexicon import Lexicon, DEFAULT_LEXICON
+
+
+def labels(lex, texts):
+    return [p["label"] for p in lex.score_batch(texts)]
+
+
+def test_whole_word_matching_and_negation():
+    lex = Lexicon(DEFAULT_LEXICON)
+    assert labels(lex, [
+        "Loved it, a must watch.",
+        "Badass action scenes",        # "bad" is not a substring match
+        "It slowly grew on me",        # neither is "slow"
+        "Not bad at all",
+        "I don't love it",
+        "Not great. Boring too",       # negation stops at the clause break
+    ]) == ["POSITIVE", "NEUTRAL", "NEUTRAL", "POSITIVE", "NEGATIVE", "NEGATIVE"]
+
+
+def test_weighted_phrases_and_batch_equivalence():
+    lex = Lexicon({"waste of time": -2.0, "great": 1.0, "must watch*": 1.5})
+    assert lex.score_text("Great cast, but a waste of time") == -1.0
+    assert lex.score_text("A must watching") == 1.5
+    texts = ["great", "a waste of time", "meh"] * 1000
+    assert lex.score_many(texts) == [lex.score_text(t) for t in texts]
+
+
+def test_negator_and_stem_led_phrases():
+    lex = Lexicon({"not bad": 1.5, "bad": -1.0, "love* it": 2.0, "love*": 1.0, "waste of time": -2.0})
+    assert lex.score_text("Not bad at all") == 1.5          # the phrase, not a negated "bad"
+    assert lex.score_text("Not very bad") == 1.0            # no phrase: "bad" is negated
+    assert lex.score_text("Loved it!") == 2.0               # stem-led phrase replaces "love*"
+    assert lex.score_text("Lovely cast") == 1.0
+    assert lex.score_text("Never a waste of time") == 2.0   # negation flips a whole phrase
+    texts = ["not bad", "loving it", "bad. Not bad"] * 1000
+    assert lex.score_many(texts) == [lex.score_text(t) for t in texts]
@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+
+from backend.app import app
+
+client = TestClient(app)
+
+
+def test_metrics_endpoint_reports_routes_and_stages(tmp_path, monkeypatch):
+    from backend import persistence_json
+
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    persistence_json.save_reviews('tt0000006', [{'text': 'Great'}, {'text': 'Boring'}])
+    assert client.post('/api/analyze/tt0000006').status_code == 200
+    client.get('/api/summary/tt0000006')
+
+    r = client.get('/api/metrics')
+    assert r.status_code == 200
+    assert r.headers['content-type'].startswith('text/plain; version=0.0.4')
+    body = r.text
+    assert 'msa_http_request_seconds_count{method="POST",route="/api/analyze/{imdb_id}",status="200"}' in body
+    assert 'msa_stage_seconds_count{stage="load_reviews"}' in body
+    assert 'msa_stage_seconds_count{stage="save_analysis"}' in body
+    assert 'msa_fallback_activations_total{reason="no_model"}' in body
+    assert '# TYPE msa_upstream_request_seconds histogram' in body
@@ -0,0 +1,90 @@
+import asyncio
+
+from backend import omdb_cache, omdb_client, persistence_json
+from backend.config import settings
+from backend.omdb_cache import TTLCache
+
+
+def test_ttl_cache_serves_stale_while_revalidating():
+    now = [0.0]
+    cache = TTLCache(max_entries=2, stale_ttl=100, clock=lambda: now[0])
+    calls = []
+
+    async def fetch():
+        calls.append(now[0])
+        return len(calls)
+
+    async def run():
+        ttl = lambda v: 10
+        assert await cache.get("a", fetch, ttl) == 1
+        assert await cache.get("a", fetch, ttl) == 1  # fresh hit
+        now[0] = 50
+        assert await cache.get("a", fetch, ttl) == 1  # stale, refresh in background
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert await cache.get("a", fetch, ttl) == 2
+        now[0] = 1000
+        assert await cache.get("a", fetch, ttl) == 3  # too stale: blocking fetch
+
+    asyncio.run(run())
+    assert calls == [0.0, 50, 1000]
+    cache.put("b", 1, 10)
+    cache.put("c", 1, 10)
+    assert "a" not in cache and "b" in cache and "c" in cache
+
+
+def test_failed_refreshes_back_off_per_key():
+    now = [0.0]
+    cache = TTLCache(max_entries=4, stale_ttl=10_000, clock=lambda: now[0], refresh_backoff=30, refresh_backoff_max=60)
+    cache.seed_stale("a", "saved")
+    calls = []
+
+    async def down():
+        calls.append(now[0])
+        raise omdb_client.OMDbUnavailable("down")
+
+    async def run(at):
+        now[0] = at
+        # concurrent stale hits share one refresh
+        assert await asyncio.gather(*(cache.get("a", down, lambda v: 10) for _ in range(5))) == ["saved"] * 5
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+    for at in (1, 2, 20, 31, 40, 90, 95, 152):
+        asyncio.run(run(at))
+    # retried 30s after the first failure, then every 60s (the cap), not on every stale hit
+    assert calls == [1, 31, 95]
+    assert cache.stats()["stale_hits"] == 40
+
+
+def test_movie_meta_served_from_disk_when_omdb_down(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    monkeypatch.setattr(omdb_cache, "_cache", None)
+    persistence_json.save_movie_meta("tt0000002", {"Title": "Saved", "Response": "True"})
+
+    async def down(imdb_id):
+        raise omdb_client.OMDbUnavailable("down")
+
+    monkeypatch.setattr(omdb_client, "get_movie_by_id", down)
+    data = asyncio.run(omdb_cache.get_movie_by_id("tt0000002"))
+    assert data["Title"] == "Saved"
+    assert omdb_cache.stats()["stale_hits"] == 1
+
+
+def test_search_misses_are_cached_briefly(monkeypatch):
+    monkeypatch.setattr(omdb_cache, "_cache", None)
+    monkeypatch.setattr(settings, "OMDB_CACHE_NEGATIVE_TTL", 60.0)
+    calls = []
+
+    async def search(query):
+        calls.append(query)
+        return {"Response": "False", "Error": "Movie not found!"}
+
+    monkeypatch.setattr(omdb_client, "search_movies", search)
+
+    async def run():
+        for q in ["Nope", "  nope ", "NOPE"]:
+            assert (await omdb_cache.search_movies(q))["Response"] == "False"
+
+    asyncio.run(run())
+    assert calls == ["Nope"]
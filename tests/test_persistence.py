@@ -0,0 +1,70 @@
+import json
+
+from backend import persistence_json as store
+from backend import persistence_sqlite
+from backend.config import settings
+
+
+def test_sqlite_backend_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "SQLITE_PATH", str(tmp_path / "store.sqlite3"))
+
+    assert store.load_reviews("tt0000001") is None
+    store.save_reviews("tt0000001", [{"text": "Great!", "source": "user", "timestamp": "t1"}])
+    assert store.append_reviews("tt0000001", [{"text": "Dull.", "source": "mock", "timestamp": "t2", "lang": "en"}]) == 2
+    assert store.load_reviews("tt0000001")[1] == {"text": "Dull.", "source": "mock", "timestamp": "t2", "lang": "en"}
+
+    rows = [{"review_id": "r1", "text": "Great!", "source": "user", "timestamp": "t1", "label": "POSITIVE", "score": 0.9}]
+    store.save_analysis("tt0000001", rows)
+    assert store.load_analysis("tt0000001") == rows
+    store.save_movie_meta("tt0000001", {"Title": "Test"})
+    assert store.load_movie_meta("tt0000001") == {"Title": "Test"}
+
+
+def test_migrate_json_tree(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_PATH", str(tmp_path / "store.sqlite3"))
+    (tmp_path / "reviews").mkdir()
+    reviews = [{"text": "Fine.", "source": "mock", "timestamp": None}]
+    (tmp_path / "reviews" / "tt0000002_raw.json").write_text(json.dumps(reviews), encoding="utf-8")
+
+    counts = persistence_sqlite.migrate_from_json(tmp_path)
+    assert counts == {"movies": 0, "reviews": 1, "analysis": 0}
+    assert persistence_sqlite.load_reviews("tt0000002") == reviews
+
+
+def test_read_cache_serves_unchanged_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "BASE", tmp_path)
+    monkeypatch.setattr(store, "_cache", store._ReadCache(1 << 20))
+    rows = [{"review_id": "r1", "text": "Great!", "source": "user", "timestamp": "t1", "label": "POSITIVE", "score": 0.9}]
+    for fmt in ("json", "columnar"):
+        monkeypatch.setattr(settings, "ANALYSIS_FORMAT", fmt)
+        store.save_analysis("tt0000003", rows)
+        first = store.load_analysis("tt0000003")
+        hits = store._cache.hits
+        first.append({"text": "caller's own row"})  # shallow copies: the cached list is untouched
+        assert store.load_analysis("tt0000003") == rows
+        assert store._cache.hits == hits + 1
+
+        store.append_analysis("tt0000003", [dict(rows[0], review_id="r2")])
+        assert [r["review_id"] for r in store.load_analysis("tt0000003")] == ["r1", "r2"]
+
+    # written compactly, and changes made behind the cache's back are noticed
+    path = store.reviews_path("tt0000003")
+    store.save_reviews("tt0000003", [{"text": "a"}])
+    assert path.read_text(encoding="utf-8") == '[{"text":"a"}]'
+    assert store.load_reviews("tt0000003") == [{"text": "a"}]
+    path.write_text('[{"text": "edited elsewhere"}]', encoding="utf-8")
+    assert store.load_reviews("tt0000003") == [{"text": "edited elsewhere"}]
+    assert not list(path.parent.glob("*.tmp*"))
+
+    # LRU eviction once the cached values' estimated sizes exceed the budget,
+    # which counts the parsed objects, not the (much smaller) file
+    size = store._estimate_size(json.loads(path.read_text(encoding="utf-8")))
+    assert size > 4 * path.stat().st_size
+    monkeypatch.setattr(store, "_cache", store._ReadCache(size + 10))
+    store.load_reviews("tt0000003")
+    store.load_movie_meta("tt0000003")  # missing files are not cached
+    assert store._cache.stats()["entries"] == 1
+    store.save_movie_meta("tt0000003", {"Title": "A title long enough to evict"})
+    assert store.load_movie_meta("tt0000003")["Title"]
+    assert store._cache.stats()["entries"] == 1
@@ -0,0 +1,21 @@
+from backend.prediction_cache import PredictionCache, text_key
+
+
+def test_cache_tiers_and_model_invalidation(tmp_path):
+    db = tmp_path / "predictions.sqlite3"
+    cache = PredictionCache(db, max_entries=2)
+    keys = [text_key("Great movie!"), text_key("  Great   movie! ")]
+    assert keys[0] == keys[1]
+
+    assert cache.lookup("m1", keys) == [None, None]
+    cache.store("m1", [(keys[0], {"label": "POSITIVE", "score": 0.9})])
+    assert cache.lookup("m1", keys)[1]["label"] == "POSITIVE"
+
+    # a fresh process only has the disk tier
+    fresh = PredictionCache(db, max_entries=2)
+    assert fresh.lookup("m1", keys[:1])[0]["score"] == 0.9
+    assert fresh.stats()["disk_hits"] == 1
+
+    # changing the model name invalidates everything cached for the old one
+    assert fresh.lookup("m2", keys[:1]) == [None]
+    assert fresh.lookup("m1", keys[:1]) == [None]
@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+
+from backend.app import app
+
+client = TestClient(app)
+
+
+def test_ready_waits_for_model_warm_up(tmp_path, monkeypatch):
+    import time
+    from backend import persistence_json, sentiment_hf
+    from backend.config import settings
+
+    assert client.get('/api/ready').json()['ready'] is True  # no preload: always ready
+
+    monkeypatch.setattr(persistence_json, "BASE", tmp_path)
+    monkeypatch.setattr(settings, "PRELOAD_MODEL", True)
+    monkeypatch.setattr(sentiment_hf, "_warmup", {"ready": False})
+    with TestClient(app) as c:
+        deadline = time.time() + 10
+        r = c.get('/api/ready')
+        while r.status_code == 503 and time.time() < deadline:
+            time.sleep(0.05)
+            r = c.get('/api/ready')
+    assert r.status_code == 200
+    body = r.json()
+    assert body['ready'] is True and body['engine']
+    assert set(body['timings']) == {'import_s', 'load_s', 'warmup_s'}